@@ -20,7 +20,10 @@ from .models import (
     AlternativeSpelling,
     Timezone,
     CarSign,
-    GiniIndex
+    GiniIndex,
+    CountryFingerprint,
+    CountryDocument,
+    RegionalRollup
 )
 
 admin.site.register(Language)
@@ -44,4 +47,6 @@ admin.site.register(AlternativeSpelling)
 admin.site.register(Timezone)
 admin.site.register(CarSign)
 admin.site.register(GiniIndex)
-
+admin.site.register(CountryFingerprint)
+admin.site.register(CountryDocument)
+admin.site.register(RegionalRollup)
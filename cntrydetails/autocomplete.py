@@ -0,0 +1,108 @@
+"""
+Prefix autocomplete over country names, cheap enough to call on every keystroke.
+
+Every name a country is known by is normalized (see cntrydetails.lookups.normalize)
+and stored in one sorted array, once from its start and once from the start of each
+later word, so "kingdom" completes "United Kingdom", ahead of every official name
+or alias starting with it. The names completing a prefix are a contiguous slice of
+that array found with two binary searches; each entry carries a precomputed rank
+and the best entry per country wins. Ranked results of
+prefixes matching many names (typically one or two letters) are memoized, so only
+their first lookup scans more than a few hundred entries. Codes are not indexed as
+prefixes; an exact cca2 or cca3 is looked up on its own.
+"""
+import heapq
+from bisect import bisect_left
+
+from .cache import per_generation
+from .lookups import normalize
+from .models import Country
+from .search import country_names
+
+# Kinds of names, best first
+KIND_RANKS = {
+    'common_name': 0,
+    'official_name': 1,
+    'spelling': 2,
+    'native': 3,
+    'translation': 4,
+}
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 25
+# Prefixes matching more entries than this have their ranked results memoized
+MEMO_THRESHOLD = 256
+
+
+class PrefixIndex:
+    """Sorted-prefix index over normalized country names"""
+
+    def __init__(self, countries, names):
+        """
+        countries: iterable of (cca2, cca3, common name, flag emoji)
+        names: iterable of (country pk, name, kind); kinds missing from KIND_RANKS are skipped
+        """
+        self.countries = {
+            pk: {'cca2': pk, 'cca3': cca3, 'name': common_name, 'flag': emoji or ''}
+            for pk, cca3, common_name, emoji in countries
+        }
+        self.codes = {}
+        for pk, country in self.countries.items():
+            self.codes[pk.casefold()] = pk
+            self.codes[country['cca3'].casefold()] = pk
+
+        best = {}  # (key, pk) -> (rank, matched name)
+        for pk, name, kind in names:
+            term = normalize(name or '')
+            if not term or pk not in self.countries or kind not in KIND_RANKS:
+                continue
+            words = term.split(' ')
+            offset = 0
+            for position, word in enumerate(words):
+                # Better kinds of names first, whole-name matches before later words, then shorter names
+                rank = (KIND_RANKS[kind], position > 0, len(term), term)
+                key = (term[offset:], pk)
+                if key not in best or rank < best[key][0]:
+                    best[key] = (rank, name)
+                offset += len(word) + 1
+
+        entries = sorted(best.items())
+        self.keys = [key for (key, pk), _ in entries]
+        self.entries = [(rank, pk, name) for (key, pk), (rank, name) in entries]
+        self.memo = {}
+
+    @classmethod
+    def build(cls):
+        """The names of country_names() with each country's flag, in four queries"""
+        return cls(Country.objects.values_list('cca2', 'cca3', 'common_name', 'flag__emoji'), country_names())
+
+    def complete(self, prefix, limit=DEFAULT_LIMIT):
+        """Best completions first, as dicts of cca2, cca3, common name, flag emoji and matched name"""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        limit = min(limit, MAX_LIMIT)
+
+        ranked = self.memo.get(prefix)
+        if ranked is None:
+            start = bisect_left(self.keys, prefix)
+            end = bisect_left(self.keys, prefix + '\U0010ffff', start)
+            best = {}
+            for rank, pk, name in self.entries[start:end]:
+                if pk not in best or rank < best[pk][0]:
+                    best[pk] = (rank, name)
+            # An exact cca2/cca3 code outranks every name
+            code_pk = self.codes.get(prefix)
+            if code_pk is not None:
+                best[code_pk] = ((-1, False, 0, prefix), prefix.upper())
+            ranked = heapq.nsmallest(MAX_LIMIT, ((rank, pk, name) for pk, (rank, name) in best.items()))
+            if end - start > MEMO_THRESHOLD:
+                self.memo[prefix] = ranked
+
+        return [dict(self.countries[pk], matched=name) for rank, pk, name in ranked[:limit]]
+
+
+get_index = per_generation(PrefixIndex.build)
+
+
+def autocomplete(prefix, limit=DEFAULT_LIMIT):
+    return get_index().complete(prefix, limit)
@@ -0,0 +1,97 @@
+"""
+Response cache for the read endpoints.
+
+Cache keys embed a dataset generation counter. Every committed write through
+the ORM (see cntrydetails.signals) and every ingest or snapshot import bumps the
+generation, which orphans all earlier entries at once; they are never served
+again and simply expire. Only successful responses are cached.
+
+The same counter drives per_generation, which holds the in-memory structures
+built from the dataset (the search and autocomplete indexes, the border graph,
+the spatial indexes). Each worker process builds its own copy on first use and
+rebuilds it on the first use after the generation has moved on, so none of them
+serves data older than the last committed write.
+"""
+import functools
+import hashlib
+import threading
+import time
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+GENERATION_KEY = 'cntrydetails:generation'
+
+
+def get_generation():
+    """Current dataset generation, starting a new one if the counter was evicted"""
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        # A fresh value never reuses the generation of entries cached before the eviction
+        cache.add(GENERATION_KEY, time.time_ns(), timeout=None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def bump_generation():
+    """Invalidate every cached response"""
+    try:
+        return cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, time.time_ns(), timeout=None)
+        return cache.get(GENERATION_KEY)
+
+
+def per_generation(build):
+    """
+    Wrap a builder of an in-process structure into a getter returning one shared
+    instance, rebuilt on the first call after the dataset generation has moved on
+    """
+    state = {'generation': None, 'value': None}
+    lock = threading.Lock()
+
+    def get():
+        generation = get_generation()
+        if state['generation'] != generation:
+            with lock:
+                if state['generation'] != generation:
+                    state['value'] = build()
+                    state['generation'] = generation
+        return state['value']
+    return get
+
+
+def response_key(namespace, request):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'cntrydetails:{namespace}:{get_generation()}:{request.accepted_media_type}:{path}'
+
+
+def cached_response(namespace):
+    """
+    Cache the successful responses of a view handler for the current generation.
+    Works on APIView methods and @api_view functions. Permission checks run
+    before the handler, so only authorized requests ever reach the cache.
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(*args, **kwargs):
+            request = args[0] if isinstance(args[0], Request) else args[1]
+            key = response_key(namespace, request)
+            hit = cache.get(key)
+            if hit is not None:
+                kind, status, payload, content_type = hit
+                if kind == 'raw':
+                    return HttpResponse(payload, status=status, content_type=content_type)
+                return Response(payload, status=status)
+
+            response = handler(*args, **kwargs)
+            if response.status_code == 200:
+                if isinstance(response, Response):
+                    cache.set(key, ('data', response.status_code, response.data, None))
+                else:
+                    cache.set(key, ('raw', response.status_code, response.content, response['Content-Type']))
+            return response
+        return wrapper
+    return decorator
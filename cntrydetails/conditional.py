@@ -0,0 +1,64 @@
+"""
+Validators for conditional GET on the country API.
+
+Each validator comes from one small query over modification state: the country
+list from the row count and the latest change to a country or its document
+(related rows only touch the document), a country's details
+from its materialized document. A 304 is answered without building the body.
+Validators also depend on the negotiated media type and the query string, so
+the JSON and browsable representations, pages and fieldsets never share an ETag.
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.views.decorators.http import condition
+
+from .lookups import country_lookup
+from .models import Country, CountryDocument
+
+
+def representation_etag(request, state):
+    query = request.META.get('QUERY_STRING', '')
+    return hashlib.sha256(f'{state}:{request.accepted_media_type}:{query}'.encode()).hexdigest()
+
+
+def list_state(request):
+    """Row count and latest modification of all countries, looked up once per request"""
+    if not hasattr(request, '_country_list_state'):
+        state = Country.objects.aggregate(
+            count=Count('pk'), modified=Max('updated_at'), documents=Max('document__updated_at')
+        )
+        stamps = [stamp for stamp in (state['modified'], state['documents']) if stamp]
+        request._country_list_state = (state['count'], max(stamps, default=None))
+    return request._country_list_state
+
+
+def list_etag(request, *args, **kwargs):
+    count, modified = list_state(request)
+    return representation_etag(request, f"{count}:{modified.isoformat() if modified else ''}")
+
+
+def list_last_modified(request, *args, **kwargs):
+    return list_state(request)[1]
+
+
+def document_state(request, kwargs):
+    """(etag, updated_at) of the addressed country's document, or (None, None) until it has one"""
+    if not hasattr(request, '_country_document_state'):
+        request._country_document_state = CountryDocument.objects.filter(
+            **country_lookup(kwargs, prefix='country__')
+        ).values_list('etag', 'updated_at').first() or (None, None)
+    return request._country_document_state
+
+
+def details_etag(request, *args, **kwargs):
+    etag, _ = document_state(request, kwargs)
+    return representation_etag(request, etag) if etag else None
+
+
+def details_last_modified(request, *args, **kwargs):
+    return document_state(request, kwargs)[1]
+
+
+country_list_condition = condition(etag_func=list_etag, last_modified_func=list_last_modified)
+country_details_condition = condition(etag_func=details_etag, last_modified_func=details_last_modified)
@@ -0,0 +1,154 @@
+"""
+Capital-to-capital great-circle distance matrix.
+
+The build_distance_matrix command computes every pairwise distance in one
+vectorized pass and writes the N x N float32 matrix as a new .npy file, then
+atomically replaces a JSON manifest naming that file and the country each row
+and column belongs to. The API opens the matrix with np.load(mmap_mode='r'):
+every worker process maps the same read-only pages from the OS page cache
+instead of loading or recomputing its own copy. Matrix files are never
+rewritten, so a reader always sees a matrix together with its own row order,
+and processes still mapping a superseded file keep it until they remap.
+"""
+import datetime
+import json
+import os
+import tempfile
+import threading
+
+import numpy as np
+from django.conf import settings
+
+from .geo import EARTH_RADIUS_KM, located_capitals
+
+MANIFEST_NAME = 'capitals.json'
+
+
+def manifest_path():
+    return os.path.join(settings.CAPITAL_DISTANCES_DIR, MANIFEST_NAME)
+
+
+def pairwise_km(lats, lons):
+    """N x N haversine distances between points given in degrees, as float32"""
+    lats, lons = np.radians(lats)[:, None], np.radians(lons)[:, None]
+    a = np.sin((lats - lats.T) / 2) ** 2 + np.cos(lats) * np.cos(lats.T) * np.sin((lons - lons.T) / 2) ** 2
+    return (2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))).astype(np.float32)
+
+
+def capital_rows():
+    """
+    (cca2, cca3, country name, capital name, latitude, longitude) of every capital
+    with known coordinates, in cca2 order
+    """
+    return list(located_capitals().order_by('country_id').values_list(
+        'country_id', 'country__cca3', 'country__common_name', 'name', 'latitude', 'longitude'
+    ))
+
+
+def read_manifest():
+    with open(manifest_path(), encoding='utf-8') as stream:
+        return json.load(stream)
+
+
+def build_matrix():
+    """
+    Compute and write a new matrix and switch the manifest over to it. Older
+    matrix files are removed, except the one just superseded, which processes
+    that read the previous manifest may still be about to map.
+    Returns the manifest.
+    """
+    directory = settings.CAPITAL_DISTANCES_DIR
+    os.makedirs(directory, exist_ok=True)
+    rows = capital_rows()
+    matrix = pairwise_km(
+        np.array([row[4] for row in rows], dtype=np.float64),
+        np.array([row[5] for row in rows], dtype=np.float64),
+    )
+
+    try:
+        previous = read_manifest()['matrix']
+    except (OSError, ValueError, KeyError):
+        previous = None
+
+    handle, matrix_file = tempfile.mkstemp(dir=directory, prefix='capitals-', suffix='.npy')
+    with os.fdopen(handle, 'wb') as stream:
+        np.save(stream, matrix)
+    os.chmod(matrix_file, 0o644)
+    manifest = {
+        'created': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'matrix': os.path.basename(matrix_file),
+        'countries': [
+            {'cca2': cca2, 'cca3': cca3, 'common_name': name, 'capital': capital}
+            for cca2, cca3, name, capital, lat, lon in rows
+        ],
+    }
+    handle, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(handle, 'w', encoding='utf-8') as stream:
+        json.dump(manifest, stream, ensure_ascii=False)
+    os.chmod(temporary, 0o644)
+    os.replace(temporary, manifest_path())
+
+    for name in os.listdir(directory):
+        if name.startswith('capitals-') and name.endswith('.npy') and name not in (manifest['matrix'], previous):
+            os.unlink(os.path.join(directory, name))
+    return manifest
+
+
+class DistanceMatrix:
+    """A memory-mapped matrix with its rows addressable by cca2 or cca3"""
+
+    def __init__(self, manifest):
+        self.created = manifest['created']
+        self.countries = manifest['countries']
+        path = os.path.join(settings.CAPITAL_DISTANCES_DIR, manifest['matrix'])
+        self.matrix = np.load(path, mmap_mode='r')
+        if self.matrix.shape != (len(self.countries), len(self.countries)):
+            raise ValueError(f'{path} does not match its manifest')
+        self.ranked_pairs = None
+        self.rows = {}
+        for row, country in enumerate(self.countries):
+            self.rows[country['cca2']] = self.rows[country['cca3']] = row
+
+    def row(self, code):
+        """Row of a country's capital by cca2 or cca3 (any case), or None"""
+        return self.rows.get(code.upper())
+
+    def distance(self, source, target):
+        return float(self.matrix[source, target])
+
+    def distances(self, source):
+        """(row, km) of every other capital, closest first"""
+        distances = np.asarray(self.matrix[source])
+        order = np.argsort(distances, kind='stable')
+        return [(int(row), float(distances[row])) for row in order if row != source]
+
+    def closest_pairs(self, k):
+        """(row, row, km) of the k closest distinct pairs of capitals"""
+        if self.ranked_pairs is None:
+            # The matrix never changes once written: rank every pair once per process
+            sources, targets = np.triu_indices(len(self.countries), 1)
+            distances = self.matrix[sources, targets]
+            order = np.argsort(distances, kind='stable')
+            self.ranked_pairs = (sources[order], targets[order], distances[order])
+        sources, targets, distances = (column[:max(k, 0)] for column in self.ranked_pairs)
+        return [(int(source), int(target), float(km)) for source, target, km in zip(sources, targets, distances)]
+
+
+_mapped = {'stamp': None, 'matrix': None}
+_lock = threading.Lock()
+
+
+def get_matrix():
+    """
+    The process-wide mapping of the current matrix, remapped when the manifest
+    has been replaced. Raises FileNotFoundError until the matrix has been built.
+    """
+    path = manifest_path()
+    stat = os.stat(path)
+    stamp = (path, stat.st_ino, stat.st_mtime_ns)
+    if _mapped['stamp'] != stamp:
+        with _lock:
+            if _mapped['stamp'] != stamp:
+                _mapped['matrix'] = DistanceMatrix(read_manifest())
+                _mapped['stamp'] = stamp
+    return _mapped['matrix']
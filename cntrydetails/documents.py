@@ -0,0 +1,146 @@
+"""
+Materialized country documents.
+
+The details endpoint serves CountryDocument.body as-is instead of running
+CountryDetailsSerializer per request. Documents are rebuilt by populate_database
+after an ingest and, for writes made through the ORM, by the handlers in
+cntrydetails.signals once the surrounding transaction commits.
+"""
+import hashlib
+import json
+
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Country, CountryDocument
+from .renderers import FastJSONRenderer
+from .serializers import CountryDetailsSerializer
+
+BATCH_SIZE = 500
+EXPORT_CHUNK_SIZE = 200
+
+
+def render_document(country):
+    """JSON body of a country exactly as the details endpoint renders it"""
+    return FastJSONRenderer().render(CountryDetailsSerializer(country).data)
+
+
+def rebuild_documents(countries=None):
+    """
+    Re-render the documents of the given country codes (cca2), or of every country.
+    Only documents whose content changed are written, so updated_at records the
+    last real change. Codes of countries that no longer exist are ignored; their
+    documents are removed along with the country. Returns the number of documents written.
+    """
+    queryset = Country.objects.order_by('pk')
+    if countries is not None:
+        queryset = queryset.filter(pk__in=list(countries))
+    current = dict(
+        CountryDocument.objects.filter(country__in=queryset.values('pk')).values_list('country_id', 'etag')
+    )
+
+    documents = []
+    for country in CountryDetailsSerializer.setup_eager_loading(queryset):
+        body = render_document(country)
+        etag = hashlib.sha256(body).hexdigest()
+        if current.get(country.pk) != etag:
+            documents.append(CountryDocument(country_id=country.pk, body=body.decode('utf-8'), etag=etag))
+
+    with transaction.atomic():
+        CountryDocument.objects.bulk_create(
+            documents,
+            batch_size=BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=['country'],
+            update_fields=['body', 'etag', 'updated_at'],
+        )
+    return len(documents)
+
+
+def rebuild_missing_documents():
+    """Build documents for countries that have none, e.g. after restoring an older snapshot"""
+    return rebuild_documents(
+        Country.objects.filter(document__isnull=True).values_list('pk', flat=True)
+    )
+
+
+def classify_code(code):
+    """(lookup field, normalized value) of a cca2, cca3 or ccn3 code, or None if it is none of them"""
+    code = code.strip()
+    if code.isdigit() and len(code) <= 3:
+        return 'ccn3', code.zfill(3)
+    if code.isalpha() and code.isascii() and len(code) in (2, 3):
+        return ('cca2' if len(code) == 2 else 'cca3'), code.upper()
+    return None
+
+
+def lookup_documents(codes):
+    """
+    JSON object mapping each requested code to its country document, followed by
+    the codes that matched no country and the malformed ones. Every code is
+    resolved in one query; countries still lacking a document are rendered together.
+    """
+    wanted = {}
+    invalid = []
+    for code in dict.fromkeys(codes):
+        key = classify_code(code)
+        if key is None:
+            invalid.append(code)
+        else:
+            wanted[code] = key
+
+    query = Q(pk__in=[])
+    for field in ('cca2', 'cca3', 'ccn3'):
+        values = {value for kind, value in wanted.values() if kind == field}
+        if values:
+            query |= Q(**{f'{field}__in': values})
+    rows = Country.objects.filter(query).values_list('cca2', 'cca3', 'ccn3', 'document__body')
+
+    index = {}
+    for cca2, cca3, ccn3, body in rows:
+        for key in (('cca2', cca2), ('cca3', cca3), ('ccn3', ccn3)):
+            index[key] = (cca2, body)
+    missing = {cca2 for cca2, body in index.values() if body is None}
+    if missing:
+        rendered = {
+            country.pk: render_document(country).decode('utf-8')
+            for country in CountryDetailsSerializer.setup_eager_loading(Country.objects.filter(pk__in=missing))
+        }
+        index = {key: (cca2, body or rendered[cca2]) for key, (cca2, body) in index.items()}
+
+    results = []
+    not_found = []
+    for code, key in wanted.items():
+        if key in index:
+            results.append(f'{json.dumps(code)}:{index[key][1]}')
+        else:
+            not_found.append(code)
+    return (
+        f'{{"results":{{{",".join(results)}}},'
+        f'"not_found":{json.dumps(not_found)},"invalid":{json.dumps(invalid)}}}'
+    )
+
+
+def iter_ndjson(chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Every country document as one JSON line, in cca2 order. Countries are read one
+    chunk at a time (keyset on the primary key) together with their stored documents;
+    any still lacking one are rendered with prefetching for that chunk only, so memory
+    stays flat however large the dataset grows.
+    """
+    last = ''
+    while True:
+        chunk = list(
+            Country.objects.filter(pk__gt=last).order_by('pk').values_list('pk', 'document__body')[:chunk_size]
+        )
+        if not chunk:
+            return
+        missing = [pk for pk, body in chunk if body is None]
+        rendered = {}
+        if missing:
+            rendered = {
+                country.pk: render_document(country).decode('utf-8')
+                for country in CountryDetailsSerializer.setup_eager_loading(Country.objects.filter(pk__in=missing))
+            }
+        yield ''.join(f'{body or rendered[pk]}\n' for pk, body in chunk).encode('utf-8')
+        last = chunk[-1][0]
@@ -0,0 +1,174 @@
+"""
+Spatial index over country centroids and capitals.
+
+Points are bucketed into a fixed latitude/longitude grid and stored sorted by
+cell, so the points of consecutive cells in a grid row form one contiguous slice
+(the layout of a compressed sparse row matrix). A query collects the slices of
+the cells overlapping the bounding box of its search circle, keeps the
+candidates whose unit vectors have a large enough dot product with the query
+point's (one matrix-vector product), and measures those with vectorized
+haversine. Nearest-neighbour queries widen the circle until it holds k points.
+With a few hundred points, as here, collecting cells costs more than it saves,
+so small indexes skip the grid and filter every point.
+"""
+import math
+
+import numpy as np
+
+from .cache import per_generation
+from .models import Capital, Country
+
+EARTH_RADIUS_KM = 6371.0088
+CELL_DEGREES = 5
+GRID_ROWS = 180 // CELL_DEGREES
+GRID_COLUMNS = 360 // CELL_DEGREES
+# Radius of the first circle searched for nearest neighbours
+NEAREST_START_KM = 500
+# Below this many points scanning all of them beats collecting grid cells
+GRID_MIN_POINTS = 2048
+
+
+def haversine_km(lat, lon, lats, lons):
+    """Great-circle distances from one point to arrays of points, all in radians"""
+    a = np.sin((lats - lat) / 2) ** 2 + math.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def unit_vectors(lats, lons):
+    """Points on the unit sphere, coordinates in radians"""
+    cos_lats = np.cos(lats)
+    return np.stack([cos_lats * np.cos(lons), cos_lats * np.sin(lons), np.sin(lats)], axis=-1)
+
+
+def unit_vector(lat, lon):
+    """unit_vectors for a single point in degrees"""
+    lat, lon = math.radians(lat), math.radians(lon)
+    return np.array([math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat)])
+
+
+def grid_row(lat):
+    return min(max(int((lat + 90) // CELL_DEGREES), 0), GRID_ROWS - 1)
+
+
+def grid_column(lon):
+    return int((lon + 180) // CELL_DEGREES) % GRID_COLUMNS
+
+
+class GeoIndex:
+    """Grid index over points on the globe, each carrying a dict of attributes"""
+
+    def __init__(self, items, lats, lons):
+        """items: one dict per point; lats, lons: their coordinates in degrees"""
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        rows = np.clip((lats + 90) // CELL_DEGREES, 0, GRID_ROWS - 1).astype(np.int64)
+        columns = ((lons + 180) // CELL_DEGREES).astype(np.int64) % GRID_COLUMNS
+        cells = rows * GRID_COLUMNS + columns
+        order = np.argsort(cells, kind='stable')
+
+        self.items = [items[i] for i in order]
+        self.lats = np.radians(lats[order])
+        self.lons = np.radians(lons[order])
+        self.vectors = unit_vectors(self.lats, self.lons)
+        # Points of cell c are [starts[c], starts[c + 1])
+        self.starts = np.searchsorted(cells[order], np.arange(GRID_ROWS * GRID_COLUMNS + 1))
+
+    def __len__(self):
+        return len(self.items)
+
+    def candidates(self, lat, lon, radius_km):
+        """Positions of the points in cells overlapping the circle's bounding box"""
+        angle = math.degrees(radius_km / EARTH_RADIUS_KM)
+        if angle >= 180 or len(self) < GRID_MIN_POINTS:
+            return np.arange(len(self))
+        lat_low, lat_high = lat - angle, lat + angle
+        if lat_low <= -90 or lat_high >= 90 or math.sin(math.radians(angle)) >= math.cos(math.radians(lat)):
+            # The circle covers a pole: every longitude is in range
+            column_ranges = [(0, GRID_COLUMNS - 1)]
+        else:
+            spread = math.degrees(math.asin(math.sin(math.radians(angle)) / math.cos(math.radians(lat))))
+            first, last = grid_column(lon - spread), grid_column(lon + spread)
+            if 2 * spread >= 360 - CELL_DEGREES:
+                column_ranges = [(0, GRID_COLUMNS - 1)]
+            elif first <= last:
+                column_ranges = [(first, last)]
+            else:  # wraps around the antimeridian
+                column_ranges = [(first, GRID_COLUMNS - 1), (0, last)]
+
+        # One contiguous slice per grid row and column range, expanded without a Python loop
+        rows = np.arange(grid_row(lat_low), grid_row(lat_high) + 1) * GRID_COLUMNS
+        lows = np.concatenate([self.starts[rows + first] for first, last in column_ranges])
+        highs = np.concatenate([self.starts[rows + last + 1] for first, last in column_ranges])
+        counts = highs - lows
+        return np.repeat(lows - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+
+    def measure(self, lat, lon, positions):
+        """(item, distance in km) of the points at the given positions, closest first"""
+        lat, lon = math.radians(lat), math.radians(lon)
+        distances = haversine_km(lat, lon, self.lats[positions], self.lons[positions])
+        ranked = np.argsort(distances, kind='stable')
+        return [(self.items[positions[i]], float(distances[i])) for i in ranked]
+
+    def cosines(self, lat, lon, positions):
+        """Cosines of the angles between a point and the points at the given positions"""
+        vectors = self.vectors if len(positions) == len(self) else self.vectors[positions]
+        # The dot product of unit vectors is the cosine of the angle between them
+        return vectors @ unit_vector(lat, lon)
+
+    def within(self, lat, lon, radius_km):
+        """(item, distance in km) of every point within the radius, closest first"""
+        positions = self.candidates(lat, lon, radius_km)
+        cosines = self.cosines(lat, lon, positions)
+        min_cosine = math.cos(min(radius_km / EARTH_RADIUS_KM, math.pi)) - 1e-12
+        return [
+            (item, distance) for item, distance in self.measure(lat, lon, positions[cosines >= min_cosine])
+            if distance <= radius_km
+        ]
+
+    def nearest(self, lat, lon, k):
+        """(item, distance in km) of the k points closest to a point, closest first"""
+        k = min(k, len(self))
+        if k <= 0:
+            return []
+        radius = NEAREST_START_KM
+        while True:
+            positions = self.candidates(lat, lon, radius)
+            if len(positions) >= k:
+                cosines = self.cosines(lat, lon, positions)
+                closest = self.measure(lat, lon, positions[np.argpartition(-cosines, k - 1)[:k]])
+                # Points outside the circle may be closer than the k-th candidate outside it
+                if closest[-1][1] <= radius or len(positions) == len(self):
+                    return closest
+            radius *= 2
+
+
+def located_capitals():
+    """
+    Capitals with known coordinates; ingest stores missing ones as 0, 0. Null
+    coordinates would turn into NaN distances, matching no radius and sorting anywhere.
+    """
+    return Capital.objects.filter(latitude__isnull=False, longitude__isnull=False).exclude(latitude=0, longitude=0)
+
+
+def build_indexes():
+    """Indexes of country centroids and of located capitals, in two queries"""
+    countries = list(Country.objects.values_list('cca2', 'cca3', 'common_name', 'latitude', 'longitude'))
+    capitals = list(located_capitals().values_list(
+        'name', 'latitude', 'longitude', 'country_id', 'country__cca3', 'country__common_name'
+    ))
+    return {
+        'countries': GeoIndex(
+            [{'cca2': cca2, 'cca3': cca3, 'common_name': name} for cca2, cca3, name, lat, lon in countries],
+            [lat for *_, lat, lon in countries],
+            [lon for *_, lat, lon in countries],
+        ),
+        'capitals': GeoIndex(
+            [{'name': name, 'cca2': cca2, 'cca3': cca3, 'common_name': country}
+             for name, lat, lon, cca2, cca3, country in capitals],
+            [lat for name, lat, lon, *_ in capitals],
+            [lon for name, lat, lon, *_ in capitals],
+        ),
+    }
+
+
+get_indexes = per_generation(build_indexes)
@@ -0,0 +1,106 @@
+"""
+In-memory land border graph.
+
+Countries are numbered 0..n-1 and borders become adjacency tuples of those
+numbers, loaded by one query over countries and their borders. Borders are
+treated as undirected, so a border recorded on one side only still connects
+both countries. Connected landmasses are found once at build time; shortest
+routes and k-hop neighborhoods are breadth-first searches over the tuples.
+"""
+from collections import deque
+
+from .cache import per_generation
+from .lookups import normalize
+from .models import Country
+
+
+class BorderGraph:
+    """Countries as nodes, land borders as undirected edges"""
+
+    def __init__(self, countries, borders):
+        """
+        countries: iterable of (cca2, cca3, common name)
+        borders: iterable of (cca2, neighbor cca2)
+        """
+        self.countries = [
+            {'cca2': cca2, 'cca3': cca3, 'common_name': common_name}
+            for cca2, cca3, common_name in sorted(countries)
+        ]
+        # Codes and normalized names, all lower case
+        self.ids = {}
+        for node, country in enumerate(self.countries):
+            for key in (country['cca2'], country['cca3'], country['common_name']):
+                self.ids[normalize(key)] = node
+
+        neighbors = [set() for _ in self.countries]
+        codes = {country['cca2']: node for node, country in enumerate(self.countries)}
+        for country, neighbor in borders:
+            if country in codes and neighbor in codes and country != neighbor:
+                neighbors[codes[country]].add(codes[neighbor])
+                neighbors[codes[neighbor]].add(codes[country])
+        self.neighbors = [tuple(sorted(adjacent)) for adjacent in neighbors]
+
+        # Connected landmasses, largest first; component[node] indexes into them
+        seen = [False] * len(self.countries)
+        self.landmasses = []
+        for start in range(len(self.countries)):
+            if not seen[start]:
+                nodes = sorted(self.within(start))
+                for node in nodes:
+                    seen[node] = True
+                self.landmasses.append(nodes)
+        self.landmasses.sort(key=lambda nodes: (-len(nodes), nodes))
+        self.component = [0] * len(self.countries)
+        for index, nodes in enumerate(self.landmasses):
+            for node in nodes:
+                self.component[node] = index
+
+    @classmethod
+    def build(cls):
+        """Every country with its borders, in one query"""
+        countries = set()
+        borders = []
+        for cca2, cca3, common_name, neighbor in Country.objects.values_list(
+                'cca2', 'cca3', 'common_name', 'borders__neighbor_id'):
+            countries.add((cca2, cca3, common_name))
+            if neighbor is not None:
+                borders.append((cca2, neighbor))
+        return cls(countries, borders)
+
+    def node(self, key):
+        """Node of a country given by cca2, cca3 or common name (any case), or None"""
+        return self.ids.get(normalize(key))
+
+    def route(self, source, target):
+        """Nodes of a shortest land route from source to target, both included, or None"""
+        if self.component[source] != self.component[target]:
+            return None
+        parents = {source: None}
+        queue = deque([source])
+        while target not in parents:
+            node = queue.popleft()
+            for neighbor in self.neighbors[node]:
+                if neighbor not in parents:
+                    parents[neighbor] = node
+                    queue.append(neighbor)
+        path = [target]
+        while parents[path[-1]] is not None:
+            path.append(parents[path[-1]])
+        return path[::-1]
+
+    def within(self, source, hops=None):
+        """{node: border crossings} of every country reachable in at most `hops` crossings (any, if None)"""
+        distances = {source: 0}
+        queue = deque([source])
+        while queue:
+            node = queue.popleft()
+            if hops is not None and distances[node] >= hops:
+                continue
+            for neighbor in self.neighbors[node]:
+                if neighbor not in distances:
+                    distances[neighbor] = distances[node] + 1
+                    queue.append(neighbor)
+        return distances
+
+
+get_graph = per_generation(BorderGraph.build)
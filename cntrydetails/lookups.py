@@ -0,0 +1,31 @@
+"""
+Normalized names and URL lookups for countries.
+
+A country is addressed in URLs by its common name, matched case- and
+accent-insensitively against Country.lookup_key (an indexed column holding the
+normalized name), or by its cca2 or cca3 code. Either way resolving it is a
+single index seek, unlike common_name__iexact, which no index can serve.
+"""
+import unicodedata
+
+# URL keyword arguments a country can be addressed by
+LOOKUP_KWARGS = ('cca2', 'cca3', 'common_name')
+
+
+def normalize(text):
+    """Casefold, strip accents and reduce punctuation to single spaces"""
+    text = unicodedata.normalize('NFKD', text.casefold())
+    text = ''.join(char if char.isalnum() else ' ' for char in text if not unicodedata.combining(char))
+    return ' '.join(text.split())
+
+
+def country_lookup(kwargs, prefix=''):
+    """
+    Filter arguments selecting the country addressed by URL kwargs; `prefix`
+    (e.g. 'country__') applies them across a relation.
+    """
+    if kwargs.get('cca2') is not None:
+        return {f'{prefix}cca2': kwargs['cca2'].upper()}
+    if kwargs.get('cca3') is not None:
+        return {f'{prefix}cca3': kwargs['cca3'].upper()}
+    return {f'{prefix}lookup_key': normalize(kwargs.get('common_name') or '')}
@@ -0,0 +1,78 @@
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from cntrydetails.autocomplete import DEFAULT_LIMIT, PrefixIndex
+from cntrydetails.models import Country
+from cntrydetails.views import CountryAutocomplete
+
+
+class Command(BaseCommand):
+    help = 'Measure autocomplete latency for every prefix a user could type of every country name'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rounds',
+            type=int,
+            default=3,
+            help='How many times to run through all prefixes (default: 3)'
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=DEFAULT_LIMIT,
+            help=f'Completions per lookup (default: {DEFAULT_LIMIT})'
+        )
+
+    def handle(self, *args, **options):
+        names = list(Country.objects.values_list('common_name', flat=True))
+        if not names:
+            raise CommandError('No countries to complete; run populate_database first')
+        prefixes = sorted({name[:end] for name in names for end in range(1, len(name) + 1)})
+
+        started = time.perf_counter()
+        index = PrefixIndex.build()
+        self.stdout.write(
+            f"Built index of {len(index.keys)} entries for {len(index.countries)} countries "
+            f"in {(time.perf_counter() - started) * 1000:.1f}ms"
+        )
+
+        # The index alone, then the whole API view (authentication, rendering) without the network
+        self.report('index', [
+            self.timed(index.complete, prefix, options['limit'])
+            for _ in range(options['rounds']) for prefix in prefixes
+        ], len(prefixes) * options['rounds'])
+
+        factory = APIRequestFactory()
+        user = User(username='benchmark')
+        CountryAutocomplete(self.request(factory, user, 'warm up', options['limit']))
+
+        timings = []
+        for _ in range(options['rounds']):
+            for prefix in prefixes:
+                request = self.request(factory, user, prefix, options['limit'])
+                timings.append(self.timed(lambda: CountryAutocomplete(request).render()))
+        self.report('view', timings, len(timings))
+
+    def request(self, factory, user, prefix, limit):
+        request = factory.get('/api/country/autocomplete/', {'q': prefix, 'limit': limit})
+        force_authenticate(request, user=user)
+        return request
+
+    @staticmethod
+    def timed(function, *args):
+        started = time.perf_counter()
+        function(*args)
+        return time.perf_counter() - started
+
+    def report(self, label, timings, count):
+        timings = sorted(timings)
+        percentiles = statistics.quantiles(timings, n=100)
+        self.stdout.write(self.style.SUCCESS(
+            f"{label}: {count} lookups, "
+            f"p50 {percentiles[49] * 1e6:.0f}us, p95 {percentiles[94] * 1e6:.0f}us, "
+            f"p99 {percentiles[98] * 1e6:.0f}us, max {timings[-1] * 1e6:.0f}us"
+        ))
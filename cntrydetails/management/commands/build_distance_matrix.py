@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cntrydetails.distances import build_matrix, manifest_path
+
+
+class Command(BaseCommand):
+    help = 'Compute the capital-to-capital great-circle distance matrix and write it for memory-mapping'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            manifest = build_matrix()
+        except OSError as e:
+            raise CommandError(f"Could not write the distance matrix: {e}")
+        elapsed = time.perf_counter() - started
+        count = len(manifest['countries'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {count}x{count} distances to {manifest['matrix']} ({manifest_path()}) in {elapsed:.2f}s"
+        ))
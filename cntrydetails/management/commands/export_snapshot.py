@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cntrydetails.snapshot import export_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Dump every cntrydetails table into a compact, versioned snapshot file'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            help='Snapshot file to write (gzip-compressed columnar JSON)'
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            counts = export_snapshot(options['path'])
+        except OSError as e:
+            raise CommandError(f"Could not write {options['path']}: {e}")
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Exported {sum(counts.values())} rows from {len(counts)} tables to {options['path']} in {elapsed:.2f}s"
+        ))
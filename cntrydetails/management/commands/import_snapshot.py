@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cntrydetails.cache import bump_generation
+from cntrydetails.documents import rebuild_missing_documents
+from cntrydetails.rollups import refresh_rollups
+from cntrydetails.snapshot import import_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Replace every cntrydetails table with the contents of a snapshot file'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            help='Snapshot file written by export_snapshot'
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            counts = import_snapshot(options['path'])
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not import {options['path']}: {e}")
+        # Snapshots taken before documents existed carry none; render them now
+        rebuilt = rebuild_missing_documents()
+        # Rollups are derived data; recompute them rather than trust the snapshot's
+        refresh_rollups()
+        bump_generation()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {sum(counts.values())} rows into {len(counts)} tables from {options['path']} in {elapsed:.2f}s"
+        ))
+        if rebuilt:
+            self.stdout.write(f"Rendered {rebuilt} missing country documents")
@@ -1,6 +1,15 @@
-import requests
-from django.core.management.base import BaseCommand
-from django.db import transaction
+import hashlib
+import json
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from itertools import islice
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
 from django.core.exceptions import ValidationError
 from cntrydetails.models import (
     Continent, Currency, Language, Region, Subregion,
@@ -8,29 +17,277 @@ from cntrydetails.models import (
     CountryFlag, CountryCoatOfArms, CountryPostalCode,
     InternationalDialing, CountryCurrency, CountryLanguage,
     TopLevelDomain, AlternativeSpelling, Timezone,
-    CarSign, GiniIndex
+    CarSign, GiniIndex, CountryFingerprint
 )
+from cntrydetails.cache import bump_generation
+from cntrydetails.documents import rebuild_documents
+from cntrydetails.lookups import normalize
+from cntrydetails.profiling import IngestProfiler, NullProfiler, profiled
+from cntrydetails.rollups import refresh_rollups
+from cntrydetails.signals import suspended
+from cntrydetails.sources import CachedFetcher, CountryFile
+from cntrydetails.transform import init_worker, pack_initial_data, transform_country
+
+# Write order for bulk ingest; countries first so every child row has its parent.
+# Borders are written in a separate phase once every country exists.
+BULK_TABLES = [
+    Country,
+    Country.continents.through,
+    CountryName,
+    Demonym,
+    CountryCurrency,
+    CountryLanguage,
+    Capital,
+    CountryFlag,
+    CountryCoatOfArms,
+    CountryPostalCode,
+    InternationalDialing,
+    TopLevelDomain,
+    AlternativeSpelling,
+    Timezone,
+    CarSign,
+    GiniIndex,
+]
+
+# Countries buffered by bulk ingest before their rows are written out
+BULK_FLUSH_COUNTRIES = 1000
+# Records handed to a transform worker per task
+TRANSFORM_CHUNKSIZE = 16
+
+DEFAULT_CHECKPOINT = Path(settings.BASE_DIR) / 'populate_database.checkpoint.json'
 
 
 class Command(BaseCommand):
     help = 'Populates database with country data from REST Countries API'
+    profiler = NullProfiler()
+
+    def add_arguments(self, parser):
+        mode = parser.add_mutually_exclusive_group()
+        mode.add_argument(
+            '--bulk',
+            action='store_true',
+            help='Build all rows in memory and write them with batched bulk_create, one pass per table'
+        )
+        mode.add_argument(
+            '--sync',
+            action='store_true',
+            help='Incrementally sync: rewrite only countries whose upstream record changed and remove missing ones'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of rows per INSERT statement in bulk mode (default: 500)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Processes transforming records into rows in bulk mode; rows are still written by one writer (default: 1)'
+        )
+        parser.add_argument(
+            '--from-file',
+            metavar='PATH',
+            help='Stream countries from a local JSON or NDJSON snapshot (optionally gzip-compressed) instead of the API'
+        )
+        parser.add_argument(
+            '--api-url',
+            default=settings.COUNTRIES_API_URL,
+            help='Countries API endpoint; point it at a local stand-in server for tests'
+        )
+        parser.add_argument(
+            '--fields',
+            type=lambda value: [field.strip() for field in value.split(',') if field.strip()],
+            help='Comma-separated fields to request from the API (fields= projection)'
+        )
+        parser.add_argument(
+            '--cache-dir',
+            default=str(settings.COUNTRIES_CACHE_DIR),
+            help='Directory keeping the last API payload and its ETag/Last-Modified validators'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Ingest the cached payload even when the API reports it has not changed'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=100,
+            help='Number of countries committed per transaction (default: 100)'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            default=str(DEFAULT_CHECKPOINT),
+            metavar='PATH',
+            help='File recording the last committed country (default: populate_database.checkpoint.json)'
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Continue a failed run after the last country recorded in the checkpoint file'
+        )
+        parser.add_argument(
+            '--profile',
+            action='store_true',
+            help='Report wall time, SQL queries, rows written and peak memory for every ingest phase'
+        )
+        parser.add_argument(
+            '--profile-json',
+            metavar='PATH',
+            help='Also write the profile as JSON to PATH (implies --profile)'
+        )
 
     def handle(self, *args, **options):
         self.stdout.write("Starting population process...")
+        profiling = options['profile'] or options['profile_json']
+        self.profiler = IngestProfiler() if profiling else NullProfiler()
         
+        self.pending_refresh = False
         try:
-            response = requests.get('https://restcountries.com/v3.1/all')
-            response.raise_for_status()
-            countries_data = response.json()
-            
-            with transaction.atomic():
-                initial_data = self.populate_initial_data(countries_data)
-                self.process_countries(countries_data, initial_data)
-                
-            self.stdout.write(self.style.SUCCESS('Successfully populated database!'))
+            # Documents, rollups and the cache generation are rebuilt once at the end
+            # of the ingest, not after every chunk its ORM writes would dirty
+            with self.profiler.run(), suspended():
+                try:
+                    self.ingest(options)
+                finally:
+                    # Chunks commit one at a time; those committed before a failure must still show
+                    if self.pending_refresh:
+                        self.refresh_derived()
+        except CommandError:
+            raise
         except Exception as e:
             self.stdout.write(self.style.ERROR(f'Error: {str(e)}'))
-
+        if profiling:
+            self.write_profile(options['profile_json'])
+
+    def ingest(self, options):
+        """Fetch the upstream data and run every ingest phase"""
+        fetcher = None
+        if options['from_file']:
+            # Re-iterable stream; every pass re-reads the file one record at a time
+            source = options['from_file']
+            countries_data = CountryFile(source)
+        else:
+            source = options['api_url']
+            fetcher = CachedFetcher(source, options['cache_dir'], fields=options['fields'])
+            countries_data, modified = fetcher.fetch()
+            if not modified and not (options['force'] or options['resume']):
+                self.stdout.write(self.style.SUCCESS('Upstream data not modified since the last fetch; nothing to do.'))
+                return
+
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1')
+        checkpoint_path = Path(options['checkpoint'])
+        checkpoint = self.load_checkpoint(checkpoint_path, source) if options['resume'] else None
+        resume_after = checkpoint['processed'] if checkpoint else 0
+        self.enable_wal()
+        
+        with transaction.atomic():
+            initial_data = self.populate_initial_data(countries_data)
+        self.pending_refresh = True
+
+        # Each chunk commits on its own so a late failure keeps earlier work
+        # and readers are never blocked for the whole run
+        pending_borders = []
+        seen = set()
+        totals = defaultdict(lambda: [0, 0.0])
+        summary = Counter()
+        processed = 0
+        if options['bulk'] and options['workers'] > 1:
+            pool = ProcessPoolExecutor(
+                max_workers=options['workers'],
+                initializer=init_worker,
+                initargs=(pack_initial_data(initial_data),)
+            )
+        else:
+            pool = nullcontext()
+        with pool as executor:
+            for chunk in self.iter_chunks(countries_data, options['chunk_size']):
+                pending_borders.extend((country_data['cca2'], country_data.get('borders', [])) for country_data in chunk)
+                seen.update(country_data['cca2'] for country_data in chunk)
+                offset = resume_after - processed
+                if 0 < offset <= len(chunk) and chunk[offset - 1]['cca2'] != checkpoint['last_cca2']:
+                    raise CommandError('Checkpoint does not match the source data; rerun without --resume')
+                todo = chunk[max(offset, 0):]  # Countries before the checkpoint were committed by an earlier run
+                processed += len(chunk)
+                if not todo:
+                    continue
+
+                with transaction.atomic():
+                    if options['bulk']:
+                        self.bulk_process_countries(todo, initial_data, options['batch_size'], totals, executor)
+                    elif options['sync']:
+                        summary.update(self.sync_countries(todo, initial_data))
+                    else:
+                        self.process_countries(todo, initial_data)
+                self.save_checkpoint(checkpoint_path, source, processed, chunk[-1]['cca2'])
+                self.stdout.write(f"Committed {processed} countries")
+
+        if resume_after > processed:
+            raise CommandError('Checkpoint is past the end of the source data; rerun without --resume')
+
+        with transaction.atomic():
+            if options['bulk']:
+                self.stdout.write("Rows written:")
+                for model in BULK_TABLES:
+                    self.report_throughput(model, *totals[model])
+            elif options['sync']:
+                summary['removed'] = len(self.remove_missing(seen))
+                self.stdout.write(
+                    f"Added {summary['added']}, updated {summary['updated']}, "
+                    f"unchanged {summary['unchanged']}, removed {summary['removed']}"
+                )
+            self.process_borders(pending_borders, options['batch_size'], prune=options['sync'])
+        self.refresh_derived()
+        self.clear_checkpoint(checkpoint_path)
+        if fetcher:
+            fetcher.commit()
+            
+        self.stdout.write(self.style.SUCCESS('Successfully populated database!'))
+
+    def write_profile(self, json_path):
+        """Print the per-phase profile and optionally save it as JSON"""
+        self.stdout.write("Profile:")
+        self.stdout.write(self.profiler.format_report())
+        if json_path:
+            Path(json_path).write_text(json.dumps(self.profiler.report(), indent=2))
+            self.stdout.write(f"Profile written to {json_path}")
+
+    def enable_wal(self):
+        """Let readers keep working while ingest writes (SQLite only; the mode persists in the file)"""
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode=WAL')
+
+    def iter_chunks(self, countries_data, chunk_size):
+        """Yield lists of at most chunk_size countries without materializing the whole source"""
+        iterator = iter(countries_data)
+        while chunk := list(islice(iterator, chunk_size)):
+            yield chunk
+
+    def load_checkpoint(self, path, source):
+        """Read the checkpoint of a previous run over the same source"""
+        try:
+            checkpoint = json.loads(path.read_text())
+        except FileNotFoundError:
+            raise CommandError(f'No checkpoint found at {path}')
+        if checkpoint['source'] != source:
+            raise CommandError(f"Checkpoint was written for {checkpoint['source']}, not {source}")
+        self.stdout.write(f"Resuming after {checkpoint['last_cca2']} ({checkpoint['processed']} countries committed)")
+        return checkpoint
+
+    def save_checkpoint(self, path, source, processed, last_cca2):
+        """Record the last committed country; written atomically so a crash never leaves half a file"""
+        temporary = path.with_name(path.name + '.tmp')
+        temporary.write_text(json.dumps({'source': source, 'processed': processed, 'last_cca2': last_cca2}))
+        temporary.replace(path)
+
+    def clear_checkpoint(self, path):
+        """Forget the checkpoint once a run has finished"""
+        path.unlink(missing_ok=True)
+
+    @profiled
     def populate_initial_data(self, countries_data):
         """Create continents, regions, subregions, currencies and languages first"""
         self.stdout.write("Processing initial data...")
@@ -116,7 +373,7 @@ class Command(BaseCommand):
 
     def process_countries(self, countries_data, initial_data):
         """Process all countries and their related data"""
-        self.stdout.write(f"Processing {len(countries_data)} countries...")
+        self.stdout.write("Processing countries...")
         
         for idx, country_data in enumerate(countries_data, 1):
             try:
@@ -128,58 +385,259 @@ class Command(BaseCommand):
                     f"Error processing {country_data.get('name', {}).get('common', 'Unknown')}: {str(e)}"
                 ))
 
-    def process_country(self, country_data, initial_data):
-        """Process a single country and all its relations"""
+    def bulk_process_countries(self, countries_data, initial_data, batch_size, totals, pool=None):
+        """
+        Build rows in memory, then write each table with one batched bulk_create.
+        Rows are flushed every BULK_FLUSH_COUNTRIES countries so streamed input
+        stays in bounded memory; row counts and timings accumulate in totals.
+        With a process pool, records are transformed in parallel and this
+        process only writes.
+        """
+        self.stdout.write("Building rows...")
+
+        codes = [country_data['cca2'] for country_data in countries_data]
+        existing = set(Country.objects.filter(cca2__in=codes).values_list('cca2', flat=True))
+        todo = [country_data for country_data in countries_data if country_data['cca2'] not in existing]  # Skip if country already exists
+
+        rows = defaultdict(list)
+        buffered = 0
+        for country_data, (country_rows, error) in zip(todo, self.transform_countries(todo, initial_data, pool)):
+            if error:
+                self.stdout.write(self.style.ERROR(
+                    f"Error processing {country_data.get('name', {}).get('common', 'Unknown')}: {error}"
+                ))
+                continue
+            for model, objs in country_rows.items():
+                rows[model].extend(objs)
+            buffered += 1
+            if buffered >= BULK_FLUSH_COUNTRIES:
+                self.flush_rows(rows, batch_size, totals)
+                buffered = 0
+        self.flush_rows(rows, batch_size, totals)
+
+    def transform_countries(self, countries_data, initial_data, pool=None):
+        """Yield (rows keyed by model, None) or (None, error) for each record, in order"""
+        if pool is None:
+            for country_data in countries_data:
+                try:
+                    yield self.build_country_rows(country_data, initial_data), None
+                except Exception as e:
+                    yield None, str(e)
+            return
+
+        for row_lists, error in pool.map(transform_country, countries_data, chunksize=TRANSFORM_CHUNKSIZE):
+            if error:
+                yield None, error
+            else:
+                yield {
+                    model: [model(*values) for values in row_list]
+                    for model, row_list in zip(BULK_TABLES, row_lists)
+                }, None
+
+    def flush_rows(self, rows, batch_size, totals):
+        """Write buffered rows table by table, accumulating row counts and timings"""
+        for model in BULK_TABLES:
+            objs = rows.pop(model, [])
+            started = time.perf_counter()
+            with self.profiler.phase(f'bulk_create {model._meta.db_table}'):
+                model.objects.bulk_create(objs, batch_size=batch_size)
+            totals[model][0] += len(objs)
+            totals[model][1] += time.perf_counter() - started
+
+    def bulk_write(self, model, objs, batch_size, **kwargs):
+        """Write one table with a batched bulk_create and report its throughput"""
+        started = time.perf_counter()
+        model.objects.bulk_create(objs, batch_size=batch_size, **kwargs)
+        self.report_throughput(model, len(objs), time.perf_counter() - started)
+
+    def report_throughput(self, model, count, elapsed):
+        """Report rows written to a table and the rate they were written at"""
+        rate = count / elapsed if elapsed else 0
+        self.stdout.write(
+            f"  {model._meta.db_table}: {count} rows in {elapsed:.3f}s ({rate:,.0f} rows/s)"
+        )
+
+    def sync_countries(self, countries_data, initial_data):
+        """Add or update countries whose upstream record changed, returning counts per outcome"""
+        self.stdout.write("Syncing countries...")
+
+        # Only this chunk's countries, so a run costs the same per chunk however many are stored
+        codes = [country_data['cca2'] for country_data in countries_data]
+        existing = set(Country.objects.filter(cca2__in=codes).values_list('cca2', flat=True))
+        fingerprints = dict(
+            CountryFingerprint.objects.filter(country_id__in=codes).values_list('country_id', 'digest')
+        )
+
+        summary = Counter()
+        for country_data in countries_data:
+            cca2 = country_data['cca2']
+            digest = self.fingerprint(country_data)
+            if cca2 in existing and fingerprints.get(cca2) == digest:
+                summary['unchanged'] += 1
+                continue
+            try:
+                with transaction.atomic():
+                    rows = self.build_country_rows(country_data, initial_data)
+                    if cca2 in existing:
+                        changes = self.sync_country(rows)
+                        if changes:
+                            summary['updated'] += 1
+                            self.stdout.write(f"  ~ {cca2}: {', '.join(changes)}")
+                        else:
+                            summary['unchanged'] += 1
+                    else:
+                        for model in BULK_TABLES:
+                            model.objects.bulk_create(rows[model])
+                        summary['added'] += 1
+                        self.stdout.write(f"  + {cca2}")
+                    CountryFingerprint.objects.update_or_create(country_id=cca2, defaults={'digest': digest})
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(
+                    f"Error processing {country_data.get('name', {}).get('common', 'Unknown')}: {str(e)}"
+                ))
+        return summary
+
+    @profiled
+    def remove_missing(self, seen):
+        """Remove countries that are no longer present upstream"""
+        removed = sorted(set(Country.objects.values_list('cca2', flat=True)) - seen)
+        if removed:
+            # Borders pointing at a removed country are protected; drop them first
+            Border.objects.filter(neighbor_id__in=removed).delete()
+            Country.objects.filter(cca2__in=removed).delete()
+            for cca2 in removed:
+                self.stdout.write(f"  - {cca2}")
+        return removed
+
+    @profiled
+    def sync_country(self, rows):
+        """Rewrite a stored country from freshly built rows, touching only what differs"""
+        changes = []
+        country = rows[Country][0]
+        stored = Country.objects.get(pk=country.pk)
+        changed_fields = [
+            field.name for field in Country._meta.concrete_fields
+            if not field.primary_key and field.name not in ('created_at', 'updated_at')
+            and field.value_from_object(stored) != field.value_from_object(country)
+        ]
+        if changed_fields:
+            for name in changed_fields:
+                setattr(stored, name, getattr(country, name))
+            stored.save()
+            changes.append('country: ' + ', '.join(changed_fields))
+
+        for model in BULK_TABLES[1:]:
+            fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+            wanted = {self.row_key(obj, fields): obj for obj in rows[model]}
+            current = {
+                self.row_key(obj, fields): obj.pk
+                for obj in model.objects.filter(country_id=country.pk)
+            }
+            stale = [pk for key, pk in current.items() if key not in wanted]
+            fresh = [obj for key, obj in wanted.items() if key not in current]
+            if stale:
+                model.objects.filter(pk__in=stale).delete()
+            if fresh:
+                model.objects.bulk_create(fresh)
+            if stale or fresh:
+                changes.append(f"{model._meta.db_table} +{len(fresh)} -{len(stale)}")
+        return changes
+
+    def row_key(self, obj, fields):
+        """Comparable key of a row's values, normalized the way the database stores them"""
+        key = []
+        for field in fields:
+            value = field.to_python(getattr(obj, field.attname))
+            if isinstance(value, (list, dict)):
+                value = json.dumps(value, sort_keys=True)
+            key.append(value)
+        return tuple(key)
+
+    def fingerprint(self, country_data):
+        """SHA-256 digest of the canonical JSON form of an upstream record"""
+        canonical = json.dumps(country_data, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    @profiled
+    def build_country_rows(self, country_data, initial_data):
+        """Build unsaved rows for a country and all its relations, keyed by model"""
+        country = Country(cca2=country_data['cca2'], **self.get_country_defaults(country_data, initial_data))
+        language_map = initial_data['language_map']
+        return {
+            Country: [country],
+            Country.continents.through: self.build_continents(country, country_data, initial_data['continent_map']),
+            CountryName: self.build_names(country, country_data, language_map),
+            CountryCurrency: self.build_currencies(country, country_data, initial_data['currency_map']),
+            CountryLanguage: self.build_languages(country, country_data, language_map),
+            Demonym: self.build_demonyms(country, country_data, language_map),
+            Capital: self.build_capital(country, country_data),
+            CountryFlag: self.build_flag(country, country_data),
+            CountryCoatOfArms: self.build_coat_of_arms(country, country_data),
+            CountryPostalCode: self.build_postal_code(country, country_data),
+            InternationalDialing: self.build_idd(country, country_data),
+            TopLevelDomain: self.build_tlds(country, country_data),
+            AlternativeSpelling: self.build_alt_spellings(country, country_data),
+            Timezone: self.build_timezones(country, country_data),
+            CarSign: self.build_car_signs(country, country_data),
+            GiniIndex: self.build_gini_index(country, country_data),
+        }
+
+    def get_country_defaults(self, country_data, initial_data):
+        """Map an upstream record onto Country field values"""
         # Get region and subregion with proper null checks
         region = initial_data['region_map'].get(country_data.get('region'))
         subregion = initial_data['subregion_map'].get(country_data.get('subregion'))
         
         # Ensure subregion belongs to the correct region
-        if subregion and region and subregion.region != region:
+        if subregion and region and subregion.region_id != region.pk:
             subregion = None
 
+        return {
+            'cca3': country_data['cca3'],
+            'ccn3': country_data.get('ccn3'),  # Some countries don't have ccn3
+            'common_name': country_data['name']['common'],
+            'official_name': country_data['name']['official'],
+            'lookup_key': normalize(country_data['name']['common']),
+            'independent': country_data.get('independent', False),
+            'un_member': country_data.get('unMember', False),
+            'status': country_data.get('status', 'user-assigned'),
+            'region': region,
+            'subregion': subregion,
+            'landlocked': country_data.get('landlocked', False),
+            'area': country_data.get('area'),
+            'latitude': country_data.get('latlng', [None, None])[0],
+            'longitude': country_data.get('latlng', [None, None])[1],
+            'population': country_data.get('population', 0),
+            'cioc': country_data.get('cioc'),
+            'fifa': country_data.get('fifa'),
+            'driving_side': country_data.get('car', {}).get('side', 'right'),
+            'start_of_week': country_data.get('startOfWeek', 'monday'),
+            'google_maps': country_data.get('maps', {}).get('googleMaps', ''),
+            'openstreet_maps': country_data.get('maps', {}).get('openStreetMaps', '')
+        }
+
+    @profiled
+    def process_country(self, country_data, initial_data):
+        """Process a single country and all its relations"""
         # Get or create the country
         country, created = Country.objects.get_or_create(
             cca2=country_data['cca2'],
-            defaults={
-                'cca3': country_data['cca3'],
-                'ccn3': country_data.get('ccn3'),  # Some countries don't have ccn3
-                'common_name': country_data['name']['common'],
-                'official_name': country_data['name']['official'],
-                'independent': country_data.get('independent', False),
-                'un_member': country_data.get('unMember', False),
-                'status': country_data.get('status', 'user-assigned'),
-                'region': region,
-                'subregion': subregion,
-                'landlocked': country_data.get('landlocked', False),
-                'area': country_data.get('area'),
-                'latitude': country_data.get('latlng', [None, None])[0],
-                'longitude': country_data.get('latlng', [None, None])[1],
-                'population': country_data.get('population', 0),
-                'cioc': country_data.get('cioc'),
-                'fifa': country_data.get('fifa'),
-                'driving_side': country_data.get('car', {}).get('side', 'right'),
-                'start_of_week': country_data.get('startOfWeek', 'monday'),
-                'google_maps': country_data.get('maps', {}).get('googleMaps', ''),
-                'openstreet_maps': country_data.get('maps', {}).get('openStreetMaps', '')
-            }
+            defaults=self.get_country_defaults(country_data, initial_data)
         )
 
         if not created:
             return  # Skip if country already exists
 
         # Add continents
-        for continent_name in country_data.get('continents', []):
-            continent = initial_data['continent_map'].get(continent_name)
-            if continent:
-                country.continents.add(continent)
+        Country.continents.through.objects.bulk_create(
+            self.build_continents(country, country_data, initial_data['continent_map'])
+        )
 
         # Process relations
         self.process_names(country, country_data, initial_data['language_map'])
         self.process_currencies(country, country_data, initial_data['currency_map'])
         self.process_languages(country, country_data, initial_data['language_map'])
         self.process_demonyms(country, country_data, initial_data['language_map'])
-        self.process_borders(country, country_data)
         self.process_capital(country, country_data)
         self.process_flag(country, country_data)
         self.process_coat_of_arms(country, country_data)
@@ -191,155 +649,316 @@ class Command(BaseCommand):
         self.process_car_signs(country, country_data)
         self.process_gini_index(country, country_data)
 
+    @profiled
+    def build_continents(self, country, country_data, continent_map):
+        """Build country-continent links"""
+        return [
+            Country.continents.through(country_id=country.pk, continent_id=continent.pk)
+            for continent_name in country_data.get('continents', [])
+            if (continent := continent_map.get(continent_name))
+        ]
+
+    @profiled
     def process_names(self, country, country_data, language_map):
         """Process native names and translations"""
+        CountryName.objects.bulk_create(self.build_names(country, country_data, language_map))
+
+    @profiled
+    def build_names(self, country, country_data, language_map):
+        """Build native names and translations"""
+        rows = []
         # Native names
         native_names = country_data.get('name', {}).get('nativeName', {})
         for lang_code, names in native_names.items():
             if language := language_map.get(lang_code):
-                CountryName.objects.create(
+                rows.append(CountryName(
                     country=country,
                     language=language,
                     name_type='native',
                     official=names.get('official', ''),
                     common=names.get('common', '')
-                )
+                ))
 
         # Translations
         translations = country_data.get('translations', {})
         for lang_code, names in translations.items():
             if language := language_map.get(lang_code):
-                CountryName.objects.create(
+                rows.append(CountryName(
                     country=country,
                     language=language,
                     name_type='translation',
                     official=names.get('official', ''),
                     common=names.get('common', '')
-                )
+                ))
+        return rows
 
+    @profiled
     def process_currencies(self, country, country_data, currency_map):
         """Process country currencies"""
-        for code in country_data.get('currencies', {}):
-            if currency := currency_map.get(code):
-                CountryCurrency.objects.create(country=country, currency=currency)
-
+        CountryCurrency.objects.bulk_create(self.build_currencies(country, country_data, currency_map))
+
+    @profiled
+    def build_currencies(self, country, country_data, currency_map):
+        """Build country currencies"""
+        return [
+            CountryCurrency(country=country, currency=currency)
+            for code in country_data.get('currencies', {})
+            if (currency := currency_map.get(code))
+        ]
+
+    @profiled
     def process_languages(self, country, country_data, language_map):
         """Process country languages"""
-        for code in country_data.get('languages', {}):
-            if language := language_map.get(code):
-                CountryLanguage.objects.create(country=country, language=language)
-
+        CountryLanguage.objects.bulk_create(self.build_languages(country, country_data, language_map))
+
+    @profiled
+    def build_languages(self, country, country_data, language_map):
+        """Build country languages"""
+        return [
+            CountryLanguage(country=country, language=language)
+            for code in country_data.get('languages', {})
+            if (language := language_map.get(code))
+        ]
+
+    @profiled
     def process_demonyms(self, country, country_data, language_map):
         """Process demonyms"""
-        demonyms = country_data.get('demonyms', {})
-        for lang_code, demonym_data in demonyms.items():
-            if language := language_map.get(lang_code):
-                Demonym.objects.create(
-                    country=country,
-                    language=language,
-                    male=demonym_data.get('m', ''),
-                    female=demonym_data.get('f', '')
-                )
+        Demonym.objects.bulk_create(self.build_demonyms(country, country_data, language_map))
 
-    def process_borders(self, country, country_data):
-        """Process bordering countries"""
-        for border_cca3 in country_data.get('borders', []):
-            try:
-                neighbor = Country.objects.get(cca3=border_cca3)
-                Border.objects.create(country=country, neighbor=neighbor)
-            except Country.DoesNotExist:
-                continue
+    @profiled
+    def build_demonyms(self, country, country_data, language_map):
+        """Build demonyms"""
+        demonyms = country_data.get('demonyms', {})
+        return [
+            Demonym(
+                country=country,
+                language=language,
+                male=demonym_data.get('m', ''),
+                female=demonym_data.get('f', '')
+            )
+            for lang_code, demonym_data in demonyms.items()
+            if (language := language_map.get(lang_code))
+        ]
+
+    def refresh_derived(self):
+        """Bring documents, rollups and cached responses up to date with whatever the ingest committed"""
+        with transaction.atomic():
+            self.build_documents()
+            self.build_rollups()
+        # Cached API responses predate the ingest
+        bump_generation()
+        self.pending_refresh = False
+
+    @profiled
+    def build_documents(self):
+        """Re-render every country document; bulk writes bypass the model signals that keep them current"""
+        self.stdout.write(f"Updated {rebuild_documents()} country documents")
+
+    @profiled
+    def build_rollups(self):
+        """Recompute the regional statistics the rollup endpoint serves"""
+        self.stdout.write(f"Refreshed {refresh_rollups()} regional rollups")
+
+    @profiled
+    def process_borders(self, pending_borders, batch_size, prune=False):
+        """
+        Process bordering countries once every country exists.
+        Neighbor codes resolve through a cca3 index built in one query, and all missing
+        borders are inserted in one batch. With prune, borders no longer listed upstream
+        are removed as well.
+        """
+        self.stdout.write("Processing borders...")
+        cca3_index = dict(Country.objects.values_list('cca3', 'pk'))
+
+        wanted = set()
+        unresolved = set()
+        known = set(cca3_index.values())
+        for cca2, border_codes in pending_borders:
+            if cca2 not in known:
+                continue  # The country itself failed to load
+            for border_cca3 in border_codes:
+                if neighbor_pk := cca3_index.get(border_cca3):
+                    wanted.add((cca2, neighbor_pk))
+                else:
+                    unresolved.add(border_cca3)
+
+        current = {
+            (country_id, neighbor_id): pk
+            for pk, country_id, neighbor_id in Border.objects.values_list('pk', 'country_id', 'neighbor_id')
+        }
+        if prune:
+            upstream = {cca2 for cca2, _ in pending_borders}
+            stale = [pk for key, pk in current.items() if key[0] in upstream and key not in wanted]
+            Border.objects.filter(pk__in=stale).delete()
+            if stale:
+                self.stdout.write(f"  Removed {len(stale)} borders")
+
+        self.bulk_write(
+            Border,
+            [Border(country_id=cca2, neighbor_id=neighbor_pk) for cca2, neighbor_pk in sorted(wanted - current.keys())],
+            batch_size
+        )
+        if unresolved:
+            self.stdout.write(self.style.WARNING(
+                f"Unknown neighbor codes skipped: {', '.join(sorted(unresolved))}"
+            ))
 
+    @profiled
     def process_capital(self, country, country_data):
         """Process capital city with proper null handling"""
+        try:
+            Capital.objects.bulk_create(self.build_capital(country, country_data))
+        except ValidationError as e:
+            self.stdout.write(self.style.WARNING(
+                f"Invalid coordinates for {country.common_name}: {str(e)}"
+            ))
+
+    @profiled
+    def build_capital(self, country, country_data):
+        """Build capital city with proper null handling"""
         capitals = country_data.get('capital', [])
         capital_info = country_data.get('capitalInfo', {}).get('latlng', [])
         
-        if capitals:
-            # Default to 0.0 if no coordinates (since model doesn't allow NULL)
-            latitude = capital_info[0] if len(capital_info) > 0 else 0.0
-            longitude = capital_info[1] if len(capital_info) > 1 else 0.0
+        if not capitals:
+            return []
             
-            try:
-                Capital.objects.create(
-                    country=country,
-                    name=capitals[0],
-                    latitude=latitude,
-                    longitude=longitude
-                )
-            except ValidationError as e:
-                self.stdout.write(self.style.WARNING(
-                    f"Invalid coordinates for {country.common_name}: {str(e)}"
-                ))
-
+        # Default to 0.0 if no coordinates (since model doesn't allow NULL)
+        latitude = capital_info[0] if len(capital_info) > 0 else 0.0
+        longitude = capital_info[1] if len(capital_info) > 1 else 0.0
+        return [Capital(
+            country=country,
+            name=capitals[0],
+            latitude=latitude,
+            longitude=longitude
+        )]
+
+    @profiled
     def process_flag(self, country, country_data):
         """Process flag information"""
+        CountryFlag.objects.bulk_create(self.build_flag(country, country_data))
+
+    @profiled
+    def build_flag(self, country, country_data):
+        """Build flag information"""
         flags = country_data.get('flags', {})
-        if flags:
-            CountryFlag.objects.create(
-                country=country,
-                emoji=country_data.get('flag', ''),
-                emoji_unicode=self.flag_to_unicode(country_data.get('flag', '')),
-                png=flags.get('png', ''),
-                svg=flags.get('svg', ''),
-                alt=flags.get('alt', '')
-            )
+        if not flags:
+            return []
+        return [CountryFlag(
+            country=country,
+            emoji=country_data.get('flag', ''),
+            emoji_unicode=self.flag_to_unicode(country_data.get('flag', '')),
+            png=flags.get('png', ''),
+            svg=flags.get('svg', ''),
+            alt=flags.get('alt', '')
+        )]
 
     def flag_to_unicode(self, flag_emoji):
         """Convert flag emoji to Unicode code points"""
         return ' '.join(f"U+{ord(c):04X}" for c in flag_emoji) if flag_emoji else ''
 
+    @profiled
     def process_coat_of_arms(self, country, country_data):
         """Process coat of arms"""
-        coat_of_arms = country_data.get('coatOfArms', {})
-        if coat_of_arms.get('png') or coat_of_arms.get('svg'):
-            CountryCoatOfArms.objects.create(
-                country=country,
-                png=coat_of_arms.get('png', ''),
-                svg=coat_of_arms.get('svg', '')
-            )
+        CountryCoatOfArms.objects.bulk_create(self.build_coat_of_arms(country, country_data))
 
+    @profiled
+    def build_coat_of_arms(self, country, country_data):
+        """Build coat of arms"""
+        coat_of_arms = country_data.get('coatOfArms', {})
+        if not (coat_of_arms.get('png') or coat_of_arms.get('svg')):
+            return []
+        return [CountryCoatOfArms(
+            country=country,
+            png=coat_of_arms.get('png', ''),
+            svg=coat_of_arms.get('svg', '')
+        )]
+
+    @profiled
     def process_postal_code(self, country, country_data):
         """Process postal code information"""
-        postal_code = country_data.get('postalCode', {})
-        if postal_code.get('format') or postal_code.get('regex'):
-            CountryPostalCode.objects.create(
-                country=country,
-                format=postal_code.get('format', ''),
-                regex=postal_code.get('regex', '')
-            )
+        CountryPostalCode.objects.bulk_create(self.build_postal_code(country, country_data))
 
+    @profiled
+    def build_postal_code(self, country, country_data):
+        """Build postal code information"""
+        postal_code = country_data.get('postalCode', {})
+        if not (postal_code.get('format') or postal_code.get('regex')):
+            return []
+        return [CountryPostalCode(
+            country=country,
+            format=postal_code.get('format', ''),
+            regex=postal_code.get('regex', '')
+        )]
+
+    @profiled
     def process_idd(self, country, country_data):
         """Process international dialing data"""
-        idd_data = country_data.get('idd', {})
-        if idd_data.get('root') or idd_data.get('suffixes'):
-            InternationalDialing.objects.create(
-                country=country,
-                root=idd_data.get('root', ''),
-                suffixes=idd_data.get('suffixes', [])
-            )
+        InternationalDialing.objects.bulk_create(self.build_idd(country, country_data))
 
+    @profiled
+    def build_idd(self, country, country_data):
+        """Build international dialing data"""
+        idd_data = country_data.get('idd', {})
+        if not (idd_data.get('root') or idd_data.get('suffixes')):
+            return []
+        return [InternationalDialing(
+            country=country,
+            root=idd_data.get('root', ''),
+            suffixes=idd_data.get('suffixes', [])
+        )]
+
+    @profiled
     def process_tlds(self, country, country_data):
         """Process top-level domains"""
-        for tld in country_data.get('tld', []):
-            TopLevelDomain.objects.create(country=country, domain=tld)
+        TopLevelDomain.objects.bulk_create(self.build_tlds(country, country_data))
+
+    @profiled
+    def build_tlds(self, country, country_data):
+        """Build top-level domains"""
+        return [TopLevelDomain(country=country, domain=tld) for tld in country_data.get('tld', [])]
 
+    @profiled
     def process_alt_spellings(self, country, country_data):
         """Process alternative spellings"""
-        for spelling in country_data.get('altSpellings', []):
-            AlternativeSpelling.objects.create(country=country, spelling=spelling)
+        AlternativeSpelling.objects.bulk_create(self.build_alt_spellings(country, country_data))
+
+    @profiled
+    def build_alt_spellings(self, country, country_data):
+        """Build alternative spellings"""
+        return [
+            AlternativeSpelling(country=country, spelling=spelling)
+            for spelling in country_data.get('altSpellings', [])
+        ]
 
+    @profiled
     def process_timezones(self, country, country_data):
         """Process timezones"""
-        for tz in country_data.get('timezones', []):
-            Timezone.objects.create(country=country, name=tz)
+        Timezone.objects.bulk_create(self.build_timezones(country, country_data))
 
+    @profiled
+    def build_timezones(self, country, country_data):
+        """Build timezones"""
+        return [Timezone(country=country, name=tz) for tz in country_data.get('timezones', [])]
+
+    @profiled
     def process_car_signs(self, country, country_data):
         """Process car signs"""
-        for sign in country_data.get('car', {}).get('signs', []):
-            CarSign.objects.create(country=country, sign=sign)
+        CarSign.objects.bulk_create(self.build_car_signs(country, country_data))
+
+    @profiled
+    def build_car_signs(self, country, country_data):
+        """Build car signs"""
+        return [CarSign(country=country, sign=sign) for sign in country_data.get('car', {}).get('signs', [])]
 
+    @profiled
     def process_gini_index(self, country, country_data):
         """Process Gini index data"""
-        for year, value in country_data.get('gini', {}).items():
-            GiniIndex.objects.create(country=country, year=year, value=value)
\ No newline at end of file
+        GiniIndex.objects.bulk_create(self.build_gini_index(country, country_data))
+
+    @profiled
+    def build_gini_index(self, country, country_data):
+        """Build Gini index data"""
+        return [
+            GiniIndex(country=country, year=year, value=value)
+            for year, value in country_data.get('gini', {}).items()
+        ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.20 on 2026-10-17 09:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cntrydetails', '0002_alter_country_common_name_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CountryFingerprint',
+            fields=[
+                ('country', models.OneToOneField(help_text='Country this fingerprint belongs to', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='fingerprint', serialize=False, to='cntrydetails.country')),
+                ('digest', models.CharField(help_text='SHA-256 digest of the canonical upstream JSON record', max_length=64)),
+                ('synced_at', models.DateTimeField(auto_now=True, help_text='When this country was last synced from upstream')),
+            ],
+            options={
+                'verbose_name': 'Country Fingerprint',
+                'verbose_name_plural': 'Country Fingerprints',
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.20 on 2026-10-17 11:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cntrydetails', '0003_countryfingerprint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CountryDocument',
+            fields=[
+                ('country', models.OneToOneField(help_text='Country this document describes', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='document', serialize=False, to='cntrydetails.country')),
+                ('body', models.TextField(help_text='Rendered JSON of the country details')),
+                ('etag', models.CharField(help_text='SHA-256 digest of the rendered body', max_length=64)),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='When this document was last rebuilt')),
+            ],
+            options={
+                'verbose_name': 'Country Document',
+                'verbose_name_plural': 'Country Documents',
+            },
+        ),
+    ]
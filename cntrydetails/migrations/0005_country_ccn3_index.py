@@ -0,0 +1,17 @@
+# Generated by Django 4.2.20 on 2026-10-17 13:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cntrydetails', '0004_countrydocument'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='country',
+            index=models.Index(fields=['ccn3'], name='cntrydetail_ccn3_92dc35_idx'),
+        ),
+    ]
@@ -0,0 +1,137 @@
+# Generated by Django 4.2.20 on 2026-10-17 15:40
+
+from django.db import migrations
+
+# One full-text row per searchable source row. Row ids are derived from the
+# source so triggers can replace or delete rows without scanning the index:
+# CountryName id*3, AlternativeSpelling id*3+1, Country (cca2 letters)*3+2.
+COUNTRY_ROWID = "((unicode(substr({row}.cca2, 1, 1)) * 256 + unicode(substr({row}.cca2, 2, 1))) * 3 + 2)"
+
+# SQLite drops these whenever a migration rebuilds cntrydetails_country (as it
+# does for most column changes); such migrations must create them again.
+COUNTRY_TRIGGERS = [
+    f"""
+    CREATE TRIGGER cntrydetails_countrysearch_country_ai AFTER INSERT ON cntrydetails_country BEGIN
+        INSERT INTO cntrydetails_countrysearch (rowid, country_id, kind, name, official, codes)
+        VALUES ({COUNTRY_ROWID.format(row='new')}, new.cca2, 'country', new.common_name, new.official_name,
+                new.cca2 || ' ' || new.cca3);
+    END
+    """,
+    f"""
+    CREATE TRIGGER cntrydetails_countrysearch_country_au AFTER UPDATE ON cntrydetails_country BEGIN
+        DELETE FROM cntrydetails_countrysearch WHERE rowid = {COUNTRY_ROWID.format(row='old')};
+        INSERT INTO cntrydetails_countrysearch (rowid, country_id, kind, name, official, codes)
+        VALUES ({COUNTRY_ROWID.format(row='new')}, new.cca2, 'country', new.common_name, new.official_name,
+                new.cca2 || ' ' || new.cca3);
+    END
+    """,
+    f"""
+    CREATE TRIGGER cntrydetails_countrysearch_country_ad AFTER DELETE ON cntrydetails_country BEGIN
+        DELETE FROM cntrydetails_countrysearch WHERE rowid = {COUNTRY_ROWID.format(row='old')};
+    END
+    """,
+]
+
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE cntrydetails_countrysearch USING fts5(
+        country_id UNINDEXED,
+        kind UNINDEXED,
+        name,
+        official,
+        codes,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    *COUNTRY_TRIGGERS,
+    """
+    CREATE TRIGGER cntrydetails_countrysearch_name_ai AFTER INSERT ON cntrydetails_countryname BEGIN
+        INSERT INTO cntrydetails_countrysearch (rowid, country_id, kind, name, official, codes)
+        VALUES (new.id * 3, new.country_id, new.name_type, new.common, new.official, '');
+    END
+    """,
+    """
+    CREATE TRIGGER cntrydetails_countrysearch_name_au AFTER UPDATE ON cntrydetails_countryname BEGIN
+        DELETE FROM cntrydetails_countrysearch WHERE rowid = old.id * 3;
+        INSERT INTO cntrydetails_countrysearch (rowid, country_id, kind, name, official, codes)
+        VALUES (new.id * 3, new.country_id, new.name_type, new.common, new.official, '');
+    END
+    """,
+    """
+    CREATE TRIGGER cntrydetails_countrysearch_name_ad AFTER DELETE ON cntrydetails_countryname BEGIN
+        DELETE FROM cntrydetails_countrysearch WHERE rowid = old.id * 3;
+    END
+    """,
+    """
+    CREATE TRIGGER cntrydetails_countrysearch_spelling_ai AFTER INSERT ON cntrydetails_alternativespelling BEGIN
+        INSERT INTO cntrydetails_countrysearch (rowid, country_id, kind, name, official, codes)
+        VALUES (new.id * 3 + 1, new.country_id, 'spelling', new.spelling, '', '');
+    END
+    """,
+    """
+    CREATE TRIGGER cntrydetails_countrysearch_spelling_au AFTER UPDATE ON cntrydetails_alternativespelling BEGIN
+        DELETE FROM cntrydetails_countrysearch WHERE rowid = old.id * 3 + 1;
+        INSERT INTO cntrydetails_countrysearch (rowid, country_id, kind, name, official, codes)
+        VALUES (new.id * 3 + 1, new.country_id, 'spelling', new.spelling, '', '');
+    END
+    """,
+    """
+    CREATE TRIGGER cntrydetails_countrysearch_spelling_ad AFTER DELETE ON cntrydetails_alternativespelling BEGIN
+        DELETE FROM cntrydetails_countrysearch WHERE rowid = old.id * 3 + 1;
+    END
+    """,
+    # Index the rows that already exist
+    f"""
+    INSERT INTO cntrydetails_countrysearch (rowid, country_id, kind, name, official, codes)
+    SELECT {COUNTRY_ROWID.format(row='cntrydetails_country')}, cca2, 'country', common_name, official_name,
+           cca2 || ' ' || cca3
+    FROM cntrydetails_country
+    """,
+    """
+    INSERT INTO cntrydetails_countrysearch (rowid, country_id, kind, name, official, codes)
+    SELECT id * 3, country_id, name_type, common, official, '' FROM cntrydetails_countryname
+    """,
+    """
+    INSERT INTO cntrydetails_countrysearch (rowid, country_id, kind, name, official, codes)
+    SELECT id * 3 + 1, country_id, 'spelling', spelling, '', '' FROM cntrydetails_alternativespelling
+    """,
+]
+
+DROP_SQL = [
+    f'DROP TRIGGER IF EXISTS cntrydetails_countrysearch_{source}_{event}'
+    for source in ('country', 'name', 'spelling')
+    for event in ('ai', 'au', 'ad')
+] + ['DROP TABLE IF EXISTS cntrydetails_countrysearch']
+
+
+def fts5_available(connection):
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pragma_module_list WHERE name = 'fts5'")
+        return cursor.fetchone() is not None
+
+
+def create_search_index(apps, schema_editor):
+    """Only SQLite builds with FTS5 get the index; elsewhere the in-memory search backend is used"""
+    if fts5_available(schema_editor.connection):
+        for sql in CREATE_SQL:
+            schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for sql in DROP_SQL:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cntrydetails', '0005_country_ccn3_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
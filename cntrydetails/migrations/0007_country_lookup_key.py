@@ -0,0 +1,58 @@
+# Generated by Django 4.2.20 on 2026-10-17 16:05
+
+import unicodedata
+from importlib import import_module
+
+from django.db import migrations, models
+
+search_index = import_module('cntrydetails.migrations.0006_country_search_fts')
+
+
+def normalize(text):
+    """Frozen copy of cntrydetails.lookups.normalize"""
+    text = unicodedata.normalize('NFKD', text.casefold())
+    text = ''.join(char if char.isalnum() else ' ' for char in text if not unicodedata.combining(char))
+    return ' '.join(text.split())
+
+
+def fill_lookup_keys(apps, schema_editor):
+    Country = apps.get_model('cntrydetails', 'Country')
+    countries = list(Country.objects.only('pk', 'common_name'))
+    for country in countries:
+        country.lookup_key = normalize(country.common_name)
+    Country.objects.bulk_update(countries, ['lookup_key'], batch_size=500)
+
+
+def restore_search_triggers(apps, schema_editor):
+    """Adding (or, on older SQLite, removing) the column rebuilds the table, dropping its FTS5 triggers"""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'cntrydetails_countrysearch'")
+        if cursor.fetchone() is None:
+            return
+    for sql in search_index.COUNTRY_TRIGGERS:
+        schema_editor.execute(sql.replace('CREATE TRIGGER', 'CREATE TRIGGER IF NOT EXISTS', 1))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cntrydetails', '0006_country_search_fts'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, restore_search_triggers),
+        migrations.AddField(
+            model_name='country',
+            name='lookup_key',
+            field=models.CharField(default='', editable=False, help_text='Case-folded, accent-stripped common name that URLs are resolved by', max_length=100),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_lookup_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='country',
+            index=models.Index(fields=['lookup_key'], name='cntrydetail_lookup__fb9fcf_idx'),
+        ),
+        migrations.RunPython(restore_search_triggers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.20 on 2026-10-17 16:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cntrydetails', '0007_country_lookup_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegionalRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('region', 'Region'), ('subregion', 'Subregion'), ('continent', 'Continent')], help_text='Which grouping this row belongs to', max_length=10)),
+                ('name', models.CharField(help_text='Name of the region, subregion or continent', max_length=100)),
+                ('countries', models.PositiveIntegerField(help_text='Number of countries in the group')),
+                ('population_total', models.PositiveBigIntegerField(help_text='Total population of the group')),
+                ('population_median', models.FloatField(help_text='Median population of the countries in the group')),
+                ('area_total', models.FloatField(blank=True, help_text='Total area in square kilometers, of the countries with a known area', null=True)),
+                ('density', models.FloatField(blank=True, help_text='Total population per square kilometer of total area', null=True)),
+                ('landlocked_count', models.PositiveIntegerField(help_text='Number of landlocked countries in the group')),
+                ('un_member_count', models.PositiveIntegerField(help_text='Number of UN member states in the group')),
+                ('refreshed_at', models.DateTimeField(auto_now=True, help_text='When this rollup was last computed')),
+            ],
+            options={
+                'verbose_name': 'Regional Rollup',
+                'verbose_name_plural': 'Regional Rollups',
+                'ordering': ['dimension', 'name'],
+                'unique_together': {('dimension', 'name')},
+            },
+        ),
+    ]
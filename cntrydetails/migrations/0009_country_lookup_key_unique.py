@@ -0,0 +1,48 @@
+# Generated by Django 4.2.20 on 2026-10-17 17:30
+
+from importlib import import_module
+
+from django.db import migrations, models
+from django.db.models import Count
+
+lookup_key = import_module('cntrydetails.migrations.0007_country_lookup_key')
+
+
+def check_lookup_keys(apps, schema_editor):
+    """Refuse to continue while two countries share a lookup key, naming them"""
+    Country = apps.get_model('cntrydetails', 'Country')
+    duplicates = (
+        Country.objects.values('lookup_key').annotate(countries=Count('pk')).filter(countries__gt=1)
+        .values_list('lookup_key', flat=True)
+    )
+    clashes = [
+        ', '.join(Country.objects.filter(lookup_key=key).order_by('pk').values_list('common_name', flat=True))
+        for key in duplicates
+    ]
+    if clashes:
+        raise ValueError(
+            "Countries whose names only differ in case, accents or punctuation: "
+            f"{'; '.join(clashes)}. Rename them before migrating."
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cntrydetails', '0008_regionalrollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, lookup_key.restore_search_triggers),
+        migrations.RunPython(check_lookup_keys, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='country',
+            name='cntrydetail_lookup__fb9fcf_idx',
+        ),
+        migrations.AlterField(
+            model_name='country',
+            name='lookup_key',
+            field=models.CharField(editable=False, help_text='Case-folded, accent-stripped common name that URLs are resolved by', max_length=100, unique=True),
+        ),
+        migrations.RunPython(lookup_key.restore_search_triggers, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,9 @@
 from django.db import models
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+from .lookups import normalize
+
 class Language(models.Model):
     """
     Represents a language with its ISO 639-3 standard code.
@@ -138,6 +141,12 @@ class Country(models.Model):
         unique=True,
         help_text="Official formal name of the country in English"
     )
+    lookup_key = models.CharField(
+        max_length=100,
+        unique=True,
+        editable=False,
+        help_text="Case-folded, accent-stripped common name that URLs are resolved by"
+    )
 
     # Core identifiers
     cca2 = models.CharField(
@@ -275,11 +284,39 @@ class Country(models.Model):
             models.Index(fields=['common_name']),
             models.Index(fields=['official_name']),
             models.Index(fields=['region', 'subregion']),
+            models.Index(fields=['ccn3']),
         ]
 
     def __str__(self):
         return self.common_name
 
+    def validate_unique(self, exclude=None):
+        """
+        Also reject a common name normalizing to another country's. Forms leave the
+        non-editable lookup_key out of their unique checks, so such a name would
+        otherwise only fail at the database.
+        """
+        errors = {}
+        try:
+            super().validate_unique(exclude)
+        except ValidationError as e:
+            errors = e.update_error_dict(errors)
+        if 'common_name' not in errors and (exclude is None or 'common_name' not in exclude):
+            others = Country.objects.filter(lookup_key=normalize(self.common_name))
+            if not self._state.adding:
+                others = others.exclude(pk=self.pk)
+            if others.exists():
+                errors['common_name'] = [ValidationError("A country with this name already exists.", code='unique')]
+        if errors:
+            raise ValidationError(errors)
+
+    def save(self, *args, **kwargs):
+        self.lookup_key = normalize(self.common_name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'common_name' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'lookup_key'}
+        super().save(*args, **kwargs)
+
 class CountryName(models.Model):
     """
     Represents alternative names for countries in different languages,
@@ -697,4 +734,121 @@ class GiniIndex(models.Model):
         verbose_name_plural = "Gini Indices"
     
     def __str__(self):
-        return f"{self.country} ({self.year}): {self.value}"
\ No newline at end of file
+        return f"{self.country} ({self.year}): {self.value}"
+
+class CountryFingerprint(models.Model):
+    """
+    Stores a digest of the upstream record a country was last synced from.
+    Used by incremental sync to rewrite only the countries whose content changed.
+    """
+    country = models.OneToOneField(
+        Country,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='fingerprint',
+        help_text="Country this fingerprint belongs to"
+    )
+    digest = models.CharField(
+        max_length=64,
+        help_text="SHA-256 digest of the canonical upstream JSON record"
+    )
+    synced_at = models.DateTimeField(
+        auto_now=True,
+        help_text="When this country was last synced from upstream"
+    )
+
+    class Meta:
+        verbose_name = "Country Fingerprint"
+        verbose_name_plural = "Country Fingerprints"
+
+    def __str__(self):
+        return f"{self.country_id}: {self.digest[:12]}"
+
+class CountryDocument(models.Model):
+    """
+    Precomputed JSON document of a country as served by the details endpoint.
+    Rebuilt whenever the country or any of its related rows change.
+    """
+    country = models.OneToOneField(
+        Country,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='document',
+        help_text="Country this document describes"
+    )
+    body = models.TextField(
+        help_text="Rendered JSON of the country details"
+    )
+    etag = models.CharField(
+        max_length=64,
+        help_text="SHA-256 digest of the rendered body"
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        help_text="When this document was last rebuilt"
+    )
+
+    class Meta:
+        verbose_name = "Country Document"
+        verbose_name_plural = "Country Documents"
+
+    def __str__(self):
+        return f"{self.country_id}: {self.etag[:12]}"
+
+class RegionalRollup(models.Model):
+    """
+    Precomputed statistics of the countries in one region, subregion or continent.
+    Refreshed after every ingest and, for ORM writes, once the transaction commits.
+    """
+    class Dimension(models.TextChoices):
+        REGION = 'region', 'Region'
+        SUBREGION = 'subregion', 'Subregion'
+        CONTINENT = 'continent', 'Continent'
+
+    dimension = models.CharField(
+        max_length=10,
+        choices=Dimension.choices,
+        help_text="Which grouping this row belongs to"
+    )
+    name = models.CharField(
+        max_length=100,
+        help_text="Name of the region, subregion or continent"
+    )
+    countries = models.PositiveIntegerField(
+        help_text="Number of countries in the group"
+    )
+    population_total = models.PositiveBigIntegerField(
+        help_text="Total population of the group"
+    )
+    population_median = models.FloatField(
+        help_text="Median population of the countries in the group"
+    )
+    area_total = models.FloatField(
+        null=True,
+        blank=True,
+        help_text="Total area in square kilometers, of the countries with a known area"
+    )
+    density = models.FloatField(
+        null=True,
+        blank=True,
+        help_text="Total population per square kilometer of total area"
+    )
+    landlocked_count = models.PositiveIntegerField(
+        help_text="Number of landlocked countries in the group"
+    )
+    un_member_count = models.PositiveIntegerField(
+        help_text="Number of UN member states in the group"
+    )
+    refreshed_at = models.DateTimeField(
+        auto_now=True,
+        help_text="When this rollup was last computed"
+    )
+
+    class Meta:
+        verbose_name = "Regional Rollup"
+        verbose_name_plural = "Regional Rollups"
+        ordering = ['dimension', 'name']
+        unique_together = ('dimension', 'name')
+
+    def __str__(self):
+        return f"{self.get_dimension_display()}: {self.name}"
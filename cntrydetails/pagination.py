@@ -0,0 +1,12 @@
+from rest_framework.pagination import CursorPagination
+
+
+class CountryCursorPagination(CursorPagination):
+    """
+    Keyset pagination over the unique, indexed common_name.
+    Each page is one indexed range scan, however deep the client pages.
+    """
+    ordering = 'common_name'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
@@ -0,0 +1,149 @@
+import functools
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+from django.db import connection
+
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE')
+
+
+class PhaseStats:
+    """Accumulated measurements of one profiled phase"""
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.queries = 0
+        self.rows_written = 0
+        self.peak_memory = 0
+
+    def as_dict(self):
+        return {
+            'calls': self.calls,
+            'seconds': round(self.seconds, 6),
+            'queries': self.queries,
+            'rows_written': self.rows_written,
+            'peak_memory_bytes': self.peak_memory,
+        }
+
+
+class IngestProfiler:
+    """
+    Per-phase wall time, SQL query count, rows written and peak traced memory.
+    Phases may nest; time, queries and rows are attributed to the innermost phase
+    only, so the phases add up to the run total. Peak memory is the highest traced
+    allocation seen while a phase (or anything inside it) was running.
+    Rows written are the cursor's rowcount. For INSERT ... RETURNING the database
+    driver only knows it once the returned rows are fetched, so a write is counted
+    when the next query starts or its phase ends.
+    """
+
+    def __init__(self):
+        self.phases = {}
+        self.stack = []
+        self.started = None
+        self.total_seconds = 0.0
+        self.pending_write = None
+
+    @contextmanager
+    def run(self):
+        """Enable query accounting and memory tracing for the duration of the block"""
+        tracemalloc.start()
+        self.started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(self.count_query):
+                with self.phase('other'):
+                    yield self
+        finally:
+            self.count_rows()
+            self.total_seconds = time.perf_counter() - self.started
+            tracemalloc.stop()
+
+    @contextmanager
+    def phase(self, name):
+        """Measure the enclosed block as one call of the named phase"""
+        if self.started is None:
+            yield
+            return
+        stats = self.phases.setdefault(name, PhaseStats())
+        stats.calls += 1
+        self.switch()
+        self.stack.append([stats, time.perf_counter()])
+        try:
+            yield
+        finally:
+            self.switch()
+            self.stack.pop()
+            if self.stack:
+                self.stack[-1][1] = time.perf_counter()
+
+    def switch(self):
+        """Charge elapsed time to the innermost phase and fold the memory peak into every open one"""
+        self.count_rows()
+        now = time.perf_counter()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.reset_peak()
+        for stats, _ in self.stack:
+            stats.peak_memory = max(stats.peak_memory, peak)
+        if self.stack:
+            self.stack[-1][0].seconds += now - self.stack[-1][1]
+            self.stack[-1][1] = now
+
+    def count_query(self, execute, sql, params, many, context):
+        """Database execute wrapper charging each query to the current phase"""
+        self.count_rows()
+        result = execute(sql, params, many, context)
+        if self.stack:
+            stats = self.stack[-1][0]
+            stats.queries += 1
+            if sql.lstrip()[:6].upper() in WRITE_STATEMENTS:
+                self.pending_write = (stats, context['cursor'])
+        return result
+
+    def count_rows(self):
+        """Charge the rows of the last write to the phase that ran it"""
+        if self.pending_write is not None:
+            stats, cursor = self.pending_write
+            self.pending_write = None
+            stats.rows_written += max(cursor.rowcount, 0)
+
+    def report(self):
+        """Phases ordered by time spent, as a JSON-serializable dict"""
+        return {
+            'total_seconds': round(self.total_seconds, 6),
+            'phases': {
+                name: stats.as_dict()
+                for name, stats in sorted(self.phases.items(), key=lambda item: -item[1].seconds)
+            },
+        }
+
+    def format_report(self):
+        """Human-readable table of the report"""
+        lines = [f"{'phase':<44}{'calls':>7}{'seconds':>10}{'queries':>9}{'rows':>9}{'peak MB':>9}"]
+        for name, stats in self.report()['phases'].items():
+            lines.append(
+                f"{name:<44}{stats['calls']:>7}{stats['seconds']:>10.3f}{stats['queries']:>9}"
+                f"{stats['rows_written']:>9}{stats['peak_memory_bytes'] / 2**20:>9.1f}"
+            )
+        lines.append(f"{'total':<44}{'':>7}{self.total_seconds:>10.3f}")
+        return '\n'.join(lines)
+
+
+class NullProfiler:
+    """Stand-in used when profiling is off"""
+
+    def phase(self, name):
+        return nullcontext()
+
+    def run(self):
+        return nullcontext(self)
+
+
+def profiled(method):
+    """Record every call of a command method as a phase of self.profiler"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.profiler.phase(method.__name__):
+            return method(self, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,76 @@
+"""
+JSON rendering for the country API.
+
+FastJSONRenderer is a drop-in for DRF's JSONRenderer that encodes with orjson
+when it is installed and falls back to the stock renderer otherwise, or when a
+client asks for indented output. Its output is byte-for-byte that of
+JSONRenderer: dates and times are formatted by DRF's encoder, and data orjson
+would write differently is handed to the stock renderer. That covers NaN and
+infinite floats (null in orjson), floats written with an exponent (1e-7 rather
+than 1e-07) and integers wider than 64 bits, which orjson rejects.
+"""
+import math
+import re
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+_fallback_encoder = JSONEncoder()
+
+# What a float orjson and json write differently turns into: null, or an exponent
+_FLOAT_MISMATCH = re.compile(rb'null|\de')
+
+
+def has_odd_float(data):
+    """Whether data, nested dicts, lists and tuples, holds a non-finite float or one written with an exponent"""
+    if isinstance(data, float):
+        return not math.isfinite(data) or 'e' in repr(data)
+    if isinstance(data, dict):
+        return any(has_odd_float(value) for value in data.values())
+    if isinstance(data, (list, tuple)):
+        return any(has_odd_float(value) for value in data)
+    return False
+
+
+class FastJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if (orjson is None or self.ensure_ascii or not self.compact
+                or self.get_indent(accepted_media_type or '', renderer_context or {})):
+            return super().render(data, accepted_media_type, renderer_context)
+        # Dates, lazy strings, decimals, UUIDs... go through DRF's own encoder
+        try:
+            ret = orjson.dumps(
+                data, default=_fallback_encoder.default,
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+            )
+        except TypeError:  # Integers wider than 64 bits
+            return super().render(data, accepted_media_type, renderer_context)
+        # The data is only searched when the output may hold such a float
+        if _FLOAT_MISMATCH.search(ret) and has_odd_float(data):
+            return super().render(data, accepted_media_type, renderer_context)
+        # Same escaping as JSONRenderer, keeping the output safe to embed in JavaScript
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class NDJSONRenderer(FastJSONRenderer):
+    """
+    Newline-delimited JSON: one line per item of a list, or a single line.
+    Streaming views bypass it with a StreamingHttpResponse; it still renders
+    their error responses and lets clients negotiate the media type.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        items = data if isinstance(data, list) else [data]
+        return b''.join(super(NDJSONRenderer, self).render(item) + b'\n' for item in items)
@@ -0,0 +1,142 @@
+"""
+Population, area and membership statistics of groups of countries.
+
+aggregate() groups countries by any combination of the DIMENSIONS, optionally
+filtered on several of them, and computes every total in a single GROUP BY
+query. The per-region, per-subregion and per-continent totals, together with
+median populations (which SQLite cannot aggregate, so they are taken from one
+more query reading populations in group order), are stored as RegionalRollup
+rows. populate_database and import_snapshot refresh them after an ingest and
+cntrydetails.signals after ORM writes, so the rollup endpoint reads a few dozen
+precomputed rows instead of every country.
+"""
+import statistics
+from itertools import groupby
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+
+from .models import Country, RegionalRollup
+
+# Dimensions countries can be grouped and filtered by, with the Country fields holding them
+DIMENSIONS = {
+    'region': 'region__name',
+    'subregion': 'subregion__name',
+    'continent': 'continents__name',
+    'landlocked': 'landlocked',
+    'un_member': 'un_member',
+    'independent': 'independent',
+    'status': 'status',
+    'driving_side': 'driving_side',
+    'start_of_week': 'start_of_week',
+}
+BOOLEAN_DIMENSIONS = {'landlocked', 'un_member', 'independent'}
+BOOLEAN_VALUES = {'true': True, '1': True, 'yes': True, 'false': False, '0': False, 'no': False}
+
+
+def metrics():
+    return {
+        'countries': Count('pk'),
+        'population_total': Sum('population'),
+        'area_total': Sum('area'),
+        'landlocked_count': Count('pk', filter=Q(landlocked=True)),
+        'un_member_count': Count('pk', filter=Q(un_member=True)),
+    }
+
+
+def density(population, area):
+    """People per square kilometer, or None without a known area"""
+    return round(population / area, 2) if population is not None and area else None
+
+
+def filter_countries(queryset, filters):
+    """
+    Countries matching every dimension in filters, a dict of dimension to a list
+    of accepted values (any of them, case-insensitive). Raises ValueError for an
+    unknown dimension or a value a boolean dimension cannot take.
+    """
+    for dimension, values in filters.items():
+        if dimension not in DIMENSIONS:
+            raise ValueError(f"Unknown dimension {dimension!r}")
+        if dimension in BOOLEAN_DIMENSIONS:
+            try:
+                accepted = {BOOLEAN_VALUES[value.lower()] for value in values}
+            except KeyError:
+                raise ValueError(f"{dimension} must be true or false")
+            condition = Q(**{f'{dimension}__in': accepted})
+        else:
+            condition = Q()
+            for value in values:
+                condition |= Q(**{f'{DIMENSIONS[dimension]}__iexact': value})
+        if dimension == 'continent':
+            # Through a subquery: joining continents would count countries on two continents twice
+            condition = Q(pk__in=Country.objects.filter(condition).values('pk'))
+        queryset = queryset.filter(condition)
+    return queryset
+
+
+def aggregate(group_by=(), filters=None):
+    """
+    Totals of the countries matching filters (see filter_countries), one dict per
+    combination of the group_by dimensions present, in one query. A country on
+    several continents counts towards each of their groups. Without group_by, a
+    single dict covering every matching country. Repeated dimensions count once.
+    """
+    group_by = list(dict.fromkeys(group_by))
+    for dimension in group_by:
+        if dimension not in DIMENSIONS:
+            raise ValueError(f"Unknown dimension {dimension!r}")
+    queryset = filter_countries(Country.objects.all(), filters or {})
+    if not group_by:
+        rows = [queryset.aggregate(**metrics())]
+    else:
+        fields = [DIMENSIONS[dimension] for dimension in group_by]
+        rows = [
+            dict({dimension: row.pop(field) for dimension, field in zip(group_by, fields)}, **row)
+            for row in queryset.order_by(*fields).values(*fields).annotate(**metrics())
+        ]
+    for row in rows:
+        row['population_total'] = row['population_total'] or 0
+        if row['area_total'] is not None:
+            row['area_total'] = round(row['area_total'], 2)
+        row['density'] = density(row['population_total'], row['area_total'])
+    return rows
+
+
+def medians(dimension):
+    """{group name: median population} over one dimension"""
+    field = DIMENSIONS[dimension]
+    populations = Country.objects.order_by(field).values_list(field, 'population')
+    return {
+        name: statistics.median(population for _, population in rows)
+        for name, rows in groupby(populations, key=lambda row: row[0])
+    }
+
+
+def refresh_rollups():
+    """Recompute every RegionalRollup, two queries per dimension, in one transaction; returns the number of rows"""
+    rollups = []
+    for dimension in RegionalRollup.Dimension.values:
+        group_medians = medians(dimension)
+        for row in aggregate([dimension]):
+            name = row.pop(dimension)
+            # Countries outside any subregion form no group of their own
+            if name is not None:
+                rollups.append(RegionalRollup(dimension=dimension, name=name, population_median=group_medians[name], **row))
+    with transaction.atomic():
+        RegionalRollup.objects.all().delete()
+        RegionalRollup.objects.bulk_create(rollups)
+    return len(rollups)
+
+
+def rollup_rows(dimension=None):
+    """Stored rollups, optionally of one dimension, as dicts grouped under their dimension"""
+    queryset = RegionalRollup.objects.all()
+    if dimension is not None:
+        queryset = queryset.filter(dimension=dimension)
+    grouped = {}
+    for row in queryset.values(
+            'dimension', 'name', 'countries', 'population_total', 'population_median', 'area_total',
+            'density', 'landlocked_count', 'un_member_count', 'refreshed_at'):
+        grouped.setdefault(row.pop('dimension'), []).append(row)
+    return grouped
@@ -0,0 +1,167 @@
+"""
+In-memory, typo-tolerant country search.
+
+Every name a country is known by (common and official English names, native
+names and translations, alternative spellings, cca2/cca3) is normalized and
+indexed by its character trigrams. A query is scored against the names sharing
+trigrams with it by trigram similarity, weighted by the kind of name that
+matched, and each country keeps its best score.
+
+With COUNTRY_SEARCH_BACKEND = 'fts5', searches go to the SQLite FTS5 table kept
+in sync by triggers (migration 0006) instead: one index shared by every worker,
+ranked by BM25 and with the matched words highlighted, but matching whole words
+and word prefixes only, without typo tolerance.
+"""
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connection
+
+from .cache import per_generation
+from .lookups import normalize
+from .models import AlternativeSpelling, Country, CountryName
+
+# How much a match on each kind of name counts
+WEIGHTS = {
+    'code': 1.0,
+    'common_name': 1.0,
+    'official_name': 0.9,
+    'native': 0.85,
+    'spelling': 0.8,
+    'translation': 0.75,
+}
+MIN_SIMILARITY = 0.3
+DEFAULT_LIMIT = 20
+
+FTS_TABLE = 'cntrydetails_countrysearch'
+# BM25 weight per FTS column: country_id, kind (unindexed), name, official, codes
+FTS_WEIGHTS = (0, 0, 10.0, 5.0, 10.0)
+
+
+def country_names():
+    """
+    Every name a country is known by, as (country pk, name, kind) with kind a key
+    of WEIGHTS, in three queries: codes, common and official English names,
+    native names and translations, and alternative spellings
+    """
+    names = []
+    for pk, cca3, common_name, official_name in Country.objects.values_list(
+            'cca2', 'cca3', 'common_name', 'official_name'):
+        names += [(pk, pk, 'code'), (pk, cca3, 'code'),
+                  (pk, common_name, 'common_name'), (pk, official_name, 'official_name')]
+    for pk, name_type, common, official in CountryName.objects.values_list(
+            'country_id', 'name_type', 'common', 'official'):
+        kind = 'native' if name_type == CountryName.NameType.NATIVE else 'translation'
+        names += [(pk, common, kind), (pk, official, kind)]
+    names += [(pk, spelling, 'spelling') for pk, spelling in
+              AlternativeSpelling.objects.values_list('country_id', 'spelling')]
+    return names
+
+
+def trigrams(term):
+    padded = f'  {term} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    """Trigram index over normalized country names"""
+
+    def __init__(self, names):
+        """names: iterable of (country pk, name, kind) with kind a key of WEIGHTS"""
+        owners = defaultdict(dict)  # term -> {country pk: weight}
+        for pk, name, kind in names:
+            term = normalize(name or '')
+            if term:
+                owners[term][pk] = max(owners[term].get(pk, 0), WEIGHTS[kind])
+
+        self.terms = sorted(owners)
+        self.owners = [owners[term] for term in self.terms]
+        self.sizes = []
+        self.postings = defaultdict(list)
+        for term_id, term in enumerate(self.terms):
+            grams = trigrams(term)
+            self.sizes.append(len(grams))
+            for gram in grams:
+                self.postings[gram].append(term_id)
+
+    @classmethod
+    def build(cls):
+        return cls(country_names())
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """Best matches first, as a list of (country pk, score, matched name)"""
+        query = normalize(query)
+        if not query:
+            return []
+
+        scores = {}
+        if len(query) < 3:
+            # Too short for trigrams: rank names starting with the query, exact ones first
+            start = bisect_left(self.terms, query)
+            for term_id in range(start, len(self.terms)):
+                term = self.terms[term_id]
+                if not term.startswith(query):
+                    break
+                self.score(scores, term_id, 1.0 if term == query else len(query) / len(term))
+        else:
+            grams = trigrams(query)
+            shared = Counter()
+            for gram in grams:
+                shared.update(self.postings.get(gram, ()))
+            for term_id, count in shared.items():
+                similarity = count / (len(grams) + self.sizes[term_id] - count)
+                term = self.terms[term_id]
+                if query in term:
+                    # Substring hits keep ranking high however long the full name is
+                    similarity = max(similarity, 0.95 if term.startswith(query) else 0.9)
+                if similarity >= MIN_SIMILARITY:
+                    self.score(scores, term_id, similarity)
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1][0], item[0]))
+        return [(pk, round(score, 4), term) for pk, (score, term) in ranked[:limit]]
+
+    def score(self, scores, term_id, similarity):
+        term = self.terms[term_id]
+        for pk, weight in self.owners[term_id].items():
+            score = similarity * weight
+            if pk not in scores or score > scores[pk][0]:
+                scores[pk] = (score, term)
+
+
+get_index = per_generation(SearchIndex.build)
+
+
+def fts_search(query, limit=DEFAULT_LIMIT):
+    """
+    Best matches from the FTS5 index, as a list of (country pk, score, highlighted name).
+    Every word of the query must start a word of one indexed name.
+    """
+    match = ' '.join(f'"{word}"*' for word in normalize(query).split())
+    if not match:
+        return []
+    weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT country_id, bm25({FTS_TABLE}, {weights}), "
+            f"highlight({FTS_TABLE}, 2, '<mark>', '</mark>'), "
+            f"highlight({FTS_TABLE}, 3, '<mark>', '</mark>'), "
+            f"highlight({FTS_TABLE}, 4, '<mark>', '</mark>') "
+            f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY 2 LIMIT %s",
+            [match, limit * 20]
+        )
+        rows = cursor.fetchall()
+
+    results = {}
+    for pk, rank, *columns in rows:
+        if pk not in results:
+            matched = next((text for text in columns if '<mark>' in text), columns[0])
+            # BM25 ranks are negative, better matches lower
+            results[pk] = (pk, round(-rank, 4), matched)
+    return list(results.values())[:limit]
+
+
+def search_countries(query, limit=DEFAULT_LIMIT):
+    if getattr(settings, 'COUNTRY_SEARCH_BACKEND', 'memory') == 'fts5':
+        return fts_search(query, limit)
+    return get_index().search(query, limit)
@@ -1,10 +1,25 @@
+from django.db.models import Prefetch
 from rest_framework import serializers
+from .lookups import normalize
 from .models import (
-    Country, CountryName, Currency, CountryCurrency, TopLevelDomain,
+    Border, Country, CountryName, Currency, CountryCurrency, TopLevelDomain,
     InternationalDialing, CountryLanguage, Language, Demonym,
     CountryFlag, CountryCoatOfArms, CountryPostalCode, GiniIndex, Capital
 )
 
+class DynamicFieldsMixin:
+    """
+    Lets a ModelSerializer be limited to a subset of its fields.
+    Pass `fields` (any iterable of names) to drop every other field;
+    names the serializer does not declare are ignored.
+    """
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
 class CountryListSerializer(serializers.ModelSerializer):
     """
     Simplified serializer for country listings.
@@ -139,7 +154,7 @@ class CapitalSerializer(serializers.ModelSerializer):
         fields = ['name', 'latitude', 'longitude']
 
 
-class CountryDetailsSerializer(serializers.ModelSerializer):
+class CountryDetailsSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """
     Comprehensive country details serializer with all related data.
     Uses optimized field types for different relationships:
@@ -210,19 +225,73 @@ class CountryDetailsSerializer(serializers.ModelSerializer):
     # Socioeconomic data
     gini_indices = GiniIndexSerializer(many=True)
 
+    # Single-row relations, joined into the country query
+    SELECT_RELATED = ['region', 'subregion', 'capital', 'flag', 'coat_of_arms', 'postal_code', 'idd']
+
+    @staticmethod
+    def prefetch_lookups():
+        """Related lists, each loaded by one extra query (built per call; Prefetch holds a queryset)"""
+        return {
+            'names': 'names',
+            'currencies': Prefetch('currencies', queryset=CountryCurrency.objects.select_related('currency')),
+            'tlds': 'tlds',
+            'continents': 'continents',
+            'alt_spellings': 'alt_spellings',
+            'languages': Prefetch('languages', queryset=CountryLanguage.objects.select_related('language')),
+            'demonyms': 'demonyms',
+            'borders': Prefetch(
+                'borders',
+                queryset=Border.objects.select_related('neighbor').only('country', 'neighbor', 'neighbor__cca3')
+            ),
+            'timezones': 'timezones',
+            'car_signs': 'car_signs',
+            'gini_indices': 'gini_indices',
+        }
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, fields=None):
+        """
+        Load everything the serializer walks in a fixed number of queries:
+        one joined query for the country and its single-row relations,
+        plus one per related list. With `fields`, only those columns and
+        relations are loaded.
+        """
+        prefetch = cls.prefetch_lookups()
+        if fields is None:
+            return queryset.select_related(*cls.SELECT_RELATED).prefetch_related(*prefetch.values())
+
+        columns = {field.name for field in Country._meta.concrete_fields}
+        return queryset.only(
+            Country._meta.pk.name, *(name for name in fields if name in columns)
+        ).select_related(
+            *(name for name in cls.SELECT_RELATED if name in fields)
+        ).prefetch_related(
+            *(lookup for name, lookup in prefetch.items() if name in fields)
+        )
+
     class Meta:
         model = Country
-        fields = '__all__'
+        exclude = ['lookup_key']  # derived from common_name, only used to resolve URLs
         
 class CountrySerializer(serializers.ModelSerializer):
     class Meta:
         model = Country
-        fields='__all__'
+        exclude=['lookup_key']
 
 
 class CreateUpdateCountrySerializer(serializers.ModelSerializer):
     class Meta:
         model=Country
-        fields='__all__'
+        exclude=['lookup_key']
+
+    def validate_common_name(self, value):
+        # URLs resolve names through lookup_key, so names differing only in case,
+        # accents or punctuation would address the same country
+        others = Country.objects.filter(lookup_key=normalize(value))
+        if self.instance is not None:
+            others = others.exclude(pk=self.instance.pk)
+        if others.exists():
+            raise serializers.ValidationError("A country with this name already exists.")
+        return value
 
 
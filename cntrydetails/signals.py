@@ -0,0 +1,161 @@
+"""
+Keep materialized country documents in step with ORM writes.
+
+Every save/delete of a country, one of its related rows, or a lookup table a
+document embeds marks the affected countries as dirty. The dirty set is
+rebuilt once the surrounding transaction commits, so a request that touches many
+rows of one country re-renders its document only once. The same flush refreshes
+the regional rollups and bumps the response cache generation. Bulk writes skip
+model signals, and populate_database runs with the handlers suspended; it
+rebuilds documents and rollups and bumps the generation itself after an ingest.
+Countries stored before the document and rollup tables existed get their
+documents and rollups at the end of the migrate run that creates them.
+"""
+import functools
+import threading
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.db import connections, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save
+
+from .models import (
+    Continent, Currency, Language, Region, Subregion,
+    Country, CountryName, Demonym, Border, Capital,
+    CountryFlag, CountryCoatOfArms, CountryPostalCode,
+    InternationalDialing, CountryCurrency, CountryLanguage,
+    TopLevelDomain, AlternativeSpelling, Timezone,
+    CarSign, GiniIndex, RegionalRollup
+)
+
+# Rows belonging to one country through their "country" foreign key
+CHILD_MODELS = [
+    CountryName, Demonym, Border, Capital, CountryFlag,
+    CountryCoatOfArms, CountryPostalCode, InternationalDialing,
+    CountryCurrency, CountryLanguage, TopLevelDomain,
+    AlternativeSpelling, Timezone, CarSign, GiniIndex,
+]
+
+# Rows embedded in the documents of other countries, with the Country lookups reaching them
+SHARED_MODELS = {
+    Country: ['pk', 'borders__neighbor'],
+    Region: ['region'],
+    Subregion: ['subregion'],
+    Continent: ['continents'],
+    Currency: ['currencies__currency'],
+    Language: ['languages__language'],
+}
+
+_pending = threading.local()
+
+
+@contextmanager
+def suspended():
+    """
+    Ignore ORM writes made by this thread inside the block. The caller takes over
+    rebuilding documents and rollups and bumping the cache generation afterwards.
+    """
+    previous = getattr(_pending, 'suspended', False)
+    _pending.suspended = True
+    try:
+        yield
+    finally:
+        _pending.suspended = previous
+
+
+def unless_suspended(handler):
+    @functools.wraps(handler)
+    def wrapper(*args, **kwargs):
+        if not getattr(_pending, 'suspended', False):
+            handler(*args, **kwargs)
+    return wrapper
+
+
+def mark_dirty(codes):
+    """
+    Queue documents for a rebuild and the response cache for invalidation when
+    the current transaction commits. Called even without codes, since a lookup
+    row no country uses yet can still appear in cached responses.
+    """
+    if not hasattr(_pending, 'codes'):
+        _pending.codes = set()
+    _pending.codes |= set(codes)
+    _pending.dirty = True
+    transaction.on_commit(flush_dirty)
+
+
+def flush_dirty():
+    """Rebuild every queued document and the rollups and bump the cache generation; later callbacks of the same commit find nothing left"""
+    from .cache import bump_generation
+    from .documents import rebuild_documents
+    from .rollups import refresh_rollups
+
+    if not getattr(_pending, 'dirty', False):
+        return
+    codes = _pending.codes
+    _pending.codes = set()
+    _pending.dirty = False
+    if codes:
+        rebuild_documents(codes)
+        refresh_rollups()
+    bump_generation()
+
+
+@unless_suspended
+def child_changed(sender, instance, **kwargs):
+    mark_dirty([instance.country_id])
+
+
+@unless_suspended
+def shared_changed(sender, instance, **kwargs):
+    codes = set()
+    for lookup in SHARED_MODELS[sender]:
+        if lookup == 'pk':
+            codes.add(instance.pk)
+        else:
+            codes.update(Country.objects.filter(**{lookup: instance}).values_list('pk', flat=True))
+    mark_dirty(codes)
+
+
+@unless_suspended
+def continents_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        mark_dirty([instance.pk])
+    elif pk_set is not None:
+        mark_dirty(pk_set)
+    else:
+        # post_clear from the continent side does not say which countries were detached
+        mark_dirty(Country.objects.values_list('pk', flat=True))
+
+
+def fill_after_migrate(sender, using, **kwargs):
+    """
+    Once the app is fully migrated, render the documents of countries that have
+    none and compute the rollups if countries exist without any
+    """
+    from .cache import bump_generation
+    from .documents import rebuild_missing_documents
+    from .rollups import refresh_rollups
+
+    executor = MigrationExecutor(connections[using])
+    if executor.migration_plan(executor.loader.graph.leaf_nodes(sender.label)):
+        return  # Migrated to an earlier state, which the current models may not match
+    written = rebuild_missing_documents()
+    if not RegionalRollup.objects.exists() and Country.objects.exists():
+        written += refresh_rollups()
+    if written:
+        bump_generation()
+
+
+def connect():
+    for model in CHILD_MODELS:
+        post_save.connect(child_changed, sender=model, dispatch_uid=f'document-{model.__name__}-save')
+        post_delete.connect(child_changed, sender=model, dispatch_uid=f'document-{model.__name__}-delete')
+    for model in SHARED_MODELS:
+        post_save.connect(shared_changed, sender=model, dispatch_uid=f'document-{model.__name__}-save')
+        post_delete.connect(shared_changed, sender=model, dispatch_uid=f'document-{model.__name__}-delete')
+    m2m_changed.connect(continents_changed, sender=Country.continents.through, dispatch_uid='document-continents')
+    post_migrate.connect(fill_after_migrate, sender=apps.get_app_config('cntrydetails'), dispatch_uid='document-migrate')
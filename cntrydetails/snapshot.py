@@ -0,0 +1,151 @@
+import datetime
+import decimal
+import gzip
+import json
+
+from django.apps import apps
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .lookups import normalize
+
+SNAPSHOT_FORMAT = 'cntrydetails-snapshot'
+SNAPSHOT_VERSION = 1
+
+# Column types whose JSON values are written to the database as they are
+RAW_TYPES = {
+    'AutoField', 'BigAutoField', 'SmallAutoField', 'BooleanField', 'CharField', 'TextField',
+    'EmailField', 'SlugField', 'URLField', 'FloatField', 'IntegerField', 'BigIntegerField',
+    'SmallIntegerField', 'PositiveIntegerField', 'PositiveBigIntegerField', 'PositiveSmallIntegerField',
+}
+
+# Columns computed from another column, filled in when restoring snapshots taken before they existed
+DERIVED_COLUMNS = {
+    ('cntrydetails.country', 'lookup_key'): ('common_name', normalize),
+}
+
+
+def snapshot_models():
+    """Every cntrydetails table, parents before the tables referencing them"""
+    remaining = list(apps.get_app_config('cntrydetails').get_models(include_auto_created=True))
+    ordered = []
+    while remaining:
+        for model in remaining:
+            parents = {
+                field.related_model for field in model._meta.concrete_fields
+                if field.is_relation and field.related_model is not model
+            }
+            if parents.issubset(ordered):
+                ordered.append(model)
+                remaining.remove(model)
+                break
+        else:
+            raise ValueError(f"Circular dependency between {', '.join(m._meta.label for m in remaining)}")
+    return ordered
+
+
+def encode_value(value):
+    """JSON fallback keeping full precision, unlike DjangoJSONEncoder's millisecond datetimes"""
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def export_snapshot(path):
+    """
+    Write every table as columns of values into a gzip-compressed JSON document.
+    Returns the number of rows written per table.
+    """
+    tables = []
+    counts = {}
+    for model in snapshot_models():
+        columns = [field.attname for field in model._meta.concrete_fields]
+        rows = list(model.objects.order_by('pk').values_list(*columns))
+        tables.append({
+            'model': model._meta.label_lower,
+            'columns': columns,
+            'data': [list(values) for values in zip(*rows)] if rows else [[] for _ in columns],
+        })
+        counts[model._meta.label_lower] = len(rows)
+
+    document = {
+        'format': SNAPSHOT_FORMAT,
+        'version': SNAPSHOT_VERSION,
+        'created': timezone.now(),
+        'tables': tables,
+    }
+    with gzip.open(path, 'wt', encoding='utf-8', compresslevel=6) as stream:
+        json.dump(document, stream, default=encode_value, separators=(',', ':'), ensure_ascii=False)
+    return counts
+
+
+def read_snapshot(path):
+    """Load and validate a snapshot document"""
+    with gzip.open(path, 'rt', encoding='utf-8') as stream:
+        document = json.load(stream)
+    if document.get('format') != SNAPSHOT_FORMAT:
+        raise ValueError(f'{path} is not a {SNAPSHOT_FORMAT} file')
+    if document.get('version') != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version {document.get('version')} (expected {SNAPSHOT_VERSION})")
+    return document
+
+
+def prepare_column(field, values):
+    """Database values of one column; only non-JSON types (dates, JSON, decimals...) need converting"""
+    target = field.target_field if field.is_relation else field
+    if target.get_internal_type() in RAW_TYPES:
+        return values
+    return [field.get_db_prep_save(field.to_python(value), connection) for value in values]
+
+
+@transaction.atomic
+def import_snapshot(path):
+    """
+    Replace the contents of every cntrydetails table with a snapshot.
+    Rows go straight to multi-row INSERT statements, bypassing model instances,
+    so auto_now timestamps keep their exported values. Batching rows per statement
+    also keeps the FTS5 search triggers cheap, since FTS5 flushes once per statement.
+    Returns the number of rows loaded per table.
+    """
+    document = read_snapshot(path)
+    tables = {table['model']: table for table in document['tables']}
+    models = snapshot_models()
+    quote = connection.ops.quote_name
+
+    with connection.cursor() as cursor:
+        for model in reversed(models):
+            cursor.execute(f'DELETE FROM {quote(model._meta.db_table)}')
+
+        counts = {}
+        for model in models:
+            table = tables.get(model._meta.label_lower)
+            if table is None:
+                counts[model._meta.label_lower] = 0
+                continue
+            fields = {field.attname: field for field in model._meta.concrete_fields}
+            columns = [column for column in table['columns'] if column in fields]
+            data = [table['data'][table['columns'].index(column)] for column in columns]
+            for (label, column), (source, derive) in DERIVED_COLUMNS.items():
+                if label == model._meta.label_lower and column not in columns and source in columns:
+                    data.append([derive(value) for value in data[columns.index(source)]])
+                    columns.append(column)
+            prepared = [prepare_column(fields[column], values) for column, values in zip(columns, data)]
+            rows = list(zip(*prepared))
+            batch_size = max(connection.ops.bulk_batch_size([fields[column] for column in columns], rows), 1)
+            placeholders = f"({', '.join(['%s'] * len(columns))})"
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start:start + batch_size]
+                cursor.execute(
+                    f"INSERT INTO {quote(model._meta.db_table)} ({', '.join(quote(column) for column in columns)}) "
+                    f"VALUES {', '.join([placeholders] * len(batch))}",
+                    [value for row in batch for value in row]
+                )
+            counts[model._meta.label_lower] = len(rows)
+
+        # Keep auto-increment sequences ahead of the restored primary keys
+        for sql in connection.ops.sequence_reset_sql(no_style(), models):
+            cursor.execute(sql)
+    return counts
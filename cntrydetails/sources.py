@@ -0,0 +1,156 @@
+import gzip
+import hashlib
+import io
+import itertools
+import json
+from pathlib import Path
+
+import requests
+
+GZIP_MAGIC = b'\x1f\x8b'
+READ_SIZE = 64 * 1024
+
+
+class CountryFile:
+    """
+    Re-iterable stream of country records from a local snapshot file.
+    Accepts a JSON array or NDJSON (one record per line), optionally gzip-compressed.
+    Every iteration re-opens the file and yields one record at a time, so
+    multi-pass ingest runs in constant memory regardless of the file size.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def __iter__(self):
+        with self.open() as stream:
+            head = stream.read(READ_SIZE)
+            first = head.lstrip()[:1]
+            if first == '[':
+                yield from iter_json_array(stream, head)
+            elif first == '{':
+                yield from iter_ndjson(stream, head)
+            elif first:
+                raise ValueError(f"{self.path}: expected a JSON array or NDJSON records")
+
+    def open(self):
+        """Open the file as text, transparently decompressing gzip"""
+        with open(self.path, 'rb') as raw:
+            compressed = raw.read(2) == GZIP_MAGIC
+        if compressed:
+            return gzip.open(self.path, 'rt', encoding='utf-8')
+        return open(self.path, encoding='utf-8')
+
+
+def iter_json_array(stream, head=''):
+    """Incrementally decode the objects of a top-level JSON array"""
+    decoder = json.JSONDecoder()
+    buffer = (head or stream.read(READ_SIZE)).lstrip()
+    if not buffer.startswith('['):
+        raise ValueError("expected a JSON array")
+    buffer = buffer[1:]
+    eof = False
+
+    while True:
+        buffer = buffer.lstrip().lstrip(',').lstrip()
+        if buffer.startswith(']'):
+            return
+        if buffer:
+            if not buffer.startswith('{'):
+                raise ValueError("expected an object in JSON array")
+            try:
+                record, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                # The object continues past the buffered text
+                if eof:
+                    raise
+            else:
+                yield record
+                buffer = buffer[end:]
+                continue
+        elif eof:
+            raise ValueError("unterminated JSON array")
+
+        # At least double the buffer before decoding it again, so a record spanning
+        # many reads is re-scanned a logarithmic number of times, not once per read
+        chunk = stream.read(max(READ_SIZE, len(buffer)))
+        eof = not chunk
+        buffer += chunk
+
+
+def iter_ndjson(stream, head=''):
+    """Decode one JSON object per non-empty line"""
+    lines = itertools.chain(io.StringIO(head + stream.readline()), stream)
+    for line_number, line in enumerate(lines, 1):
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"line {line_number}: {e}") from e
+
+
+class CachedFetcher:
+    """
+    Fetches the upstream countries payload with conditional requests.
+    The last payload and its ETag/Last-Modified validators are kept on disk, so an
+    unchanged upstream costs one small request answered with 304 Not Modified.
+    New validators are only stored by commit(), after the payload was ingested, so
+    a failed ingest is retried on the next run instead of being skipped.
+    """
+
+    def __init__(self, url, cache_dir, fields=None, timeout=60):
+        self.url = url
+        self.params = {'fields': ','.join(fields)} if fields else {}
+        self.timeout = timeout
+        # Different URLs or field projections get their own cache entry
+        key = hashlib.sha256(json.dumps([url, self.params]).encode()).hexdigest()[:16]
+        self.cache_dir = Path(cache_dir)
+        self.payload_path = self.cache_dir / f'{key}.json.gz'
+        self.meta_path = self.cache_dir / f'{key}.meta.json'
+        self.pending_path = self.cache_dir / f'{key}.json.gz.tmp'
+        self.pending_meta = None
+
+    def fetch(self):
+        """
+        Return (countries, modified). countries is a CountryFile over the cached payload;
+        modified is False when the upstream answered 304 for the cached validators.
+        """
+        meta = self.load_meta()
+        headers = {'Accept-Encoding': 'gzip'}
+        if meta and self.payload_path.exists():
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        with requests.get(self.url, params=self.params, headers=headers, timeout=self.timeout, stream=True) as response:
+            if response.status_code == 304:
+                return CountryFile(self.payload_path), False
+            response.raise_for_status()
+
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            # iter_content undoes the transfer compression; the cache stores its own gzip
+            with gzip.open(self.pending_path, 'wb') as cached:
+                for chunk in response.iter_content(chunk_size=READ_SIZE):
+                    cached.write(chunk)
+            self.pending_meta = {
+                'url': response.url,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+            }
+        return CountryFile(self.pending_path), True
+
+    def commit(self):
+        """Keep the fetched payload and its validators for the next conditional request"""
+        if self.pending_meta is None:
+            return
+        self.pending_path.replace(self.payload_path)
+        self.meta_path.write_text(json.dumps(self.pending_meta))
+        self.pending_meta = None
+
+    def load_meta(self):
+        """Validators of the cached payload, if any"""
+        try:
+            return json.loads(self.meta_path.read_text())
+        except (FileNotFoundError, ValueError):
+            return None
@@ -1,3 +1,751 @@
-from django.test import TestCase
+import gzip
+import json
+import threading
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
+from django.core.management.sql import emit_post_migrate_signal
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+
+from .autocomplete import PrefixIndex
+from .cache import get_generation
+from .documents import render_document
+from .management.commands.populate_database import BULK_TABLES, Command
+from .models import (
+    Border, Capital, Country, CountryDocument, CountryFingerprint, RegionalRollup, TopLevelDomain
+)
+from .renderers import FastJSONRenderer
+from .snapshot import export_snapshot, import_snapshot
+from .sources import CachedFetcher, CountryFile, iter_json_array, iter_ndjson
+
+
+def country_record(cca2, cca3, name, **extra):
+    """Minimal REST Countries v3.1 record"""
+    record = {
+        'name': {'common': name, 'official': f'Republic of {name}', 'nativeName': {}},
+        'cca2': cca2,
+        'cca3': cca3,
+        'region': 'Europe',
+        'subregion': 'Western Europe',
+        'continents': ['Europe'],
+        'latlng': [50.0, 10.0],
+        'population': 1000,
+        'languages': {'eng': 'English'},
+        'currencies': {'EUR': {'name': 'Euro', 'symbol': '€'}},
+        'maps': {'googleMaps': 'https://goo.gl/maps/x', 'openStreetMaps': 'https://www.openstreetmap.org/x'},
+    }
+    record.update(extra)
+    return record
+
+
+# Keeps response caching inside the test process and away from the development cache
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+COUNTRIES = [
+    country_record('AA', 'AAA', 'Aland', borders=['BBB']),
+    country_record('BB', 'BBB', 'Borduria', borders=['AAA']),
+]
+
+# A country with a row in most relation tables
+CARPANIA = country_record(
+    'CC', 'CCC', 'Carpania',
+    borders=['AAA', 'BBB'], capital=['Carpa'], tld=['.cc'], altSpellings=['CC'],
+    capitalInfo={'latlng': [50.0, 10.0]},
+    timezones=['UTC+01:00'], car={'signs': ['CP'], 'side': 'right'}, gini={'2018': 30.1},
+    idd={'root': '+3', 'suffixes': ['1']}, flag='🏳',
+    flags={'png': 'https://x/cc.png', 'svg': 'https://x/cc.svg'},
+    demonyms={'eng': {'f': 'Carpanian', 'm': 'Carpanian'}},
+)
+
+
+def stored_rows():
+    """Every ingested row by table, without surrogate keys or timestamps, so separate runs compare equal"""
+    rows = {}
+    for model in BULK_TABLES + [Border]:
+        fields = [
+            field.attname for field in model._meta.concrete_fields
+            if field.attname not in ('id', 'created_at', 'updated_at')
+        ]
+        rows[model._meta.db_table] = sorted(model.objects.values_list(*fields), key=repr)
+    return rows
+
+
+class StandInCountriesAPI(BaseHTTPRequestHandler):
+    """Local stand-in for the countries API that honours If-None-Match"""
+    etag = '"v1"'
+    payload = COUNTRIES
+
+    def do_GET(self):
+        self.server.seen_headers.append(dict(self.headers))
+        self.server.seen_paths.append(self.path)
+        if self.headers.get('If-None-Match') == self.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = json.dumps(self.payload).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', self.etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInServerMixin:
+    def setUp(self):
+        super().setUp()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StandInCountriesAPI)
+        self.server.seen_headers = []
+        self.server.seen_paths = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f'http://127.0.0.1:{self.server.server_port}/v3.1/all'
+        tmp = TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+
+
+class CountingReader(StringIO):
+    """Text stream recording how often it was read"""
+    reads = 0
+
+    def read(self, size=-1):
+        self.reads += 1
+        return super().read(size)
+
+
+class SourceParsingTests(SimpleTestCase):
+    @mock.patch('cntrydetails.sources.READ_SIZE', 16)
+    def test_large_record_is_not_rescanned_per_read(self):
+        records = [{'cca2': 'AA', 'note': 'x' * 20000}, {'cca2': 'BB'}]
+        stream = CountingReader(json.dumps(records))
+        self.assertEqual(list(iter_json_array(stream)), records)
+        # The buffer doubles before each retry instead of growing by 16 characters
+        self.assertLess(stream.reads, 20)
+
+    @mock.patch('cntrydetails.sources.READ_SIZE', 7)
+    def test_records_split_across_reads(self):
+        records = COUNTRIES + [CARPANIA]
+        snapshots = {
+            'countries.json': json.dumps(records, indent=1),
+            'countries.ndjson': '\n'.join(json.dumps(record) for record in records) + '\n\n',
+        }
+        with TemporaryDirectory() as tmp:
+            for name, text in snapshots.items():
+                plain, compressed = Path(tmp) / name, Path(tmp) / f'{name}.gz'
+                plain.write_text(text)
+                compressed.write_bytes(gzip.compress(text.encode()))
+                for path in (plain, compressed):
+                    countries = CountryFile(path)
+                    self.assertEqual(list(countries), records, path)
+                    # Every pass re-reads the file
+                    self.assertEqual(list(countries), records, path)
+
+    def test_truncated_input_is_rejected(self):
+        with self.assertRaises(ValueError):
+            list(iter_json_array(StringIO('[{"cca2": "AA"}, {"cca2"')))
+        with self.assertRaises(ValueError):
+            list(iter_json_array(StringIO('[{"cca2": "AA"}')))
+        with self.assertRaisesMessage(ValueError, 'line 2'):
+            list(iter_ndjson(StringIO('{"cca2": "AA"}\n{"cca2"\n')))
+
+
+class FakeResponse:
+    """Streamed requests response with a canned status, body and headers"""
+
+    def __init__(self, status_code, body=b'', headers=None, url='https://countries.test/v3.1/all'):
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers or {}
+        self.url = url
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(self.status_code)
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.body), chunk_size):
+            yield self.body[start:start + chunk_size]
+
+
+class CachedFetcherTests(StandInServerMixin, SimpleTestCase):
+    def test_not_modified_reuses_cached_payload(self):
+        url = 'https://countries.test/v3.1/all'
+        validators = {'ETag': '"v2"', 'Last-Modified': 'Wed, 01 Jan 2025 00:00:00 GMT'}
+        responses = [FakeResponse(200, json.dumps(COUNTRIES).encode(), validators), FakeResponse(304)]
+        with mock.patch('cntrydetails.sources.requests.get', side_effect=responses) as get:
+            fetcher = CachedFetcher(url, self.tmp, fields=['cca2', 'name'])
+            fetcher.fetch()
+            fetcher.commit()
+            countries, modified = CachedFetcher(url, self.tmp, fields=['cca2', 'name']).fetch()
+
+        self.assertFalse(modified)
+        self.assertEqual(list(countries), COUNTRIES)
+        first, second = get.call_args_list
+        self.assertNotIn('If-None-Match', first.kwargs['headers'])
+        self.assertEqual(second.kwargs['headers']['If-None-Match'], '"v2"')
+        self.assertEqual(second.kwargs['headers']['If-Modified-Since'], validators['Last-Modified'])
+        self.assertEqual(second.kwargs['params'], {'fields': 'cca2,name'})
+        # Another projection of the same URL is cached separately
+        self.assertNotEqual(CachedFetcher(url, self.tmp).payload_path, fetcher.payload_path)
+
+    def test_unchanged_upstream_is_served_from_cache(self):
+        fetcher = CachedFetcher(self.url, self.tmp)
+        countries, modified = fetcher.fetch()
+        self.assertTrue(modified)
+        self.assertEqual(list(countries), COUNTRIES)
+        fetcher.commit()
+
+        countries, modified = CachedFetcher(self.url, self.tmp).fetch()
+        self.assertFalse(modified)
+        self.assertEqual(list(countries), COUNTRIES)
+        self.assertEqual(self.server.seen_headers[-1]['If-None-Match'], '"v1"')
+
+    def test_validators_are_only_kept_after_commit(self):
+        CachedFetcher(self.url, self.tmp).fetch()
+        _, modified = CachedFetcher(self.url, self.tmp).fetch()
+        self.assertTrue(modified)
+        self.assertNotIn('If-None-Match', self.server.seen_headers[-1])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class PopulateDatabaseTests(StandInServerMixin, TestCase):
+    def populate(self, *args):
+        out = StringIO()
+        call_command(
+            'populate_database', *args,
+            api_url=self.url, cache_dir=str(self.tmp), checkpoint=str(self.tmp / 'checkpoint.json'),
+            stdout=out,
+        )
+        return out.getvalue()
+
+    def populate_from(self, records, *args):
+        """Run the command on a local snapshot of the given records"""
+        path = self.tmp / 'countries.json'
+        path.write_text(json.dumps(records))
+        return self.populate('--from-file', str(path), *args)
+
+    def clear_countries(self):
+        Border.objects.all().delete()
+        Country.objects.all().delete()
+
+    def test_bulk_matches_row_by_row(self):
+        self.populate_from(COUNTRIES + [CARPANIA])
+        expected = stored_rows()
+        self.assertEqual(len(expected['cntrydetails_timezone']), 1)
+        self.clear_countries()
+
+        output = self.populate_from(COUNTRIES + [CARPANIA], '--bulk', '--batch-size', '2')
+        self.assertIn('cntrydetails_country: 3 rows', output)
+        self.assertEqual(stored_rows(), expected)
+
+    def test_worker_pool_matches_serial_transform(self):
+        records = COUNTRIES + [CARPANIA, country_record('DD', 'DDD', 'Dravia', borders=['CCC'])]
+        self.populate_from(records, '--bulk')
+        expected = stored_rows()
+        self.clear_countries()
+
+        # Chunks smaller than the data, so the pool is fed more than once
+        self.populate_from(records, '--bulk', '--workers', '2', '--chunk-size', '3')
+        self.assertEqual(stored_rows(), expected)
+        self.assertEqual(Country.objects.count(), 4)
+
+    def profile(self, *args):
+        path = self.tmp / 'profile.json'
+        self.populate_from(COUNTRIES + [CARPANIA], '--profile-json', str(path), *args)
+        return json.loads(path.read_text())['phases']
+
+    def test_profile_counts_queries_and_rows_per_phase(self):
+        phases = self.profile()
+        # Continent, region, subregion, currency and language
+        self.assertEqual(phases['populate_initial_data']['rows_written'], 5)
+        # Each country and its continent link
+        self.assertEqual(phases['process_country']['rows_written'], 6)
+        # Only Carpania has timezones; empty bulk_create calls run no query
+        self.assertEqual(
+            {key: phases['process_timezones'][key] for key in ('calls', 'queries', 'rows_written')},
+            {'calls': 3, 'queries': 1, 'rows_written': 1}
+        )
+        self.assertEqual((phases['build_timezones']['calls'], phases['build_timezones']['queries']), (3, 0))
+        self.assertEqual(phases['process_borders']['rows_written'], 4)
+
+        self.clear_countries()
+        phases = self.profile('--bulk', '--batch-size', '2')
+        # Two INSERT ... RETURNING statements for three countries
+        self.assertEqual(
+            {key: phases['bulk_create cntrydetails_country'][key] for key in ('queries', 'rows_written')},
+            {'queries': 2, 'rows_written': 3}
+        )
+        self.assertEqual(phases['bulk_create cntrydetails_countryflag']['rows_written'], 1)
+        self.assertEqual(phases['build_flag']['calls'], 3)
+
+    def test_borders_resolve_after_every_country_exists(self):
+        # Carpania is committed alone, before either of its neighbors exists
+        carpania = dict(CARPANIA, borders=['AAA', 'BBB', 'ZZZ'])
+        output = self.populate_from([carpania] + COUNTRIES, '--chunk-size', '1')
+        self.assertEqual(
+            set(Border.objects.values_list('country_id', 'neighbor_id')),
+            {('CC', 'AA'), ('CC', 'BB'), ('AA', 'BB'), ('BB', 'AA')}
+        )
+        self.assertIn('Unknown neighbor codes skipped: ZZZ', output)
+        # The cca3 index and the stored borders, however many neighbors are listed
+        pending = [(record['cca2'], record['borders']) for record in [carpania] + COUNTRIES]
+        with self.assertNumQueries(2):
+            Command(stdout=StringIO()).process_borders(pending, batch_size=500)
+
+    def test_sync_rewrites_only_what_changed(self):
+        output = self.populate_from(COUNTRIES + [CARPANIA], '--sync')
+        self.assertIn('Added 3, updated 0, unchanged 0, removed 0', output)
+        unchanged_since = Country.objects.get(pk='BB').updated_at
+
+        aland, borduria = COUNTRIES
+        records = [
+            dict(aland, population=2000, tld=['.aa'], borders=[]),
+            borduria,
+            country_record('DD', 'DDD', 'Dravia', borders=['AAA']),
+        ]
+        output = self.populate_from(records, '--sync')
+        self.assertIn('Added 1, updated 1, unchanged 1, removed 1', output)
+        self.assertIn('~ AA: country: population, cntrydetails_topleveldomain +1 -0', output)
+        self.assertIn('- CC', output)
+
+        self.assertEqual(set(Country.objects.values_list('pk', flat=True)), {'AA', 'BB', 'DD'})
+        self.assertEqual(Country.objects.get(pk='AA').population, 2000)
+        self.assertEqual(list(TopLevelDomain.objects.filter(country='AA').values_list('domain', flat=True)), ['.aa'])
+        self.assertEqual(Country.objects.get(pk='BB').updated_at, unchanged_since)
+        # Borders Aland no longer lists are pruned; those of the removed country go with it
+        self.assertEqual(set(Border.objects.values_list('country_id', 'neighbor_id')), {('BB', 'AA'), ('DD', 'AA')})
+        self.assertEqual(CountryFingerprint.objects.count(), 3)
+
+        output = self.populate_from(records, '--sync')
+        self.assertIn('Added 0, updated 0, unchanged 3, removed 0', output)
+
+    def fail_on_chunk(self, number, method='process_countries'):
+        """Patch row-by-row (or sync) ingest to fail on the given chunk; returns the codes of every chunk it was given"""
+        process_countries = getattr(Command, method)
+        chunks = []
+
+        def process(command, countries_data, initial_data):
+            chunks.append([record['cca2'] for record in countries_data])
+            if len(chunks) == number:
+                raise RuntimeError('connection lost')
+            return process_countries(command, countries_data, initial_data)
+        patcher = mock.patch.object(Command, method, autospec=True, side_effect=process)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return chunks
+
+    def test_resume_after_failed_chunk(self):
+        records = COUNTRIES + [CARPANIA, country_record('DD', 'DDD', 'Dravia'), country_record('EE', 'EEE', 'Estrania')]
+        chunks = self.fail_on_chunk(2)
+        output = self.populate_from(records, '--chunk-size', '2')
+        self.assertIn('Error: connection lost', output)
+        # The first chunk stays committed; the failed one was rolled back
+        self.assertEqual(set(Country.objects.values_list('pk', flat=True)), {'AA', 'BB'})
+        checkpoint = json.loads((self.tmp / 'checkpoint.json').read_text())
+        self.assertEqual((checkpoint['processed'], checkpoint['last_cca2']), (2, 'BB'))
+
+        output = self.populate_from(records, '--chunk-size', '2', '--resume')
+        self.assertIn('Resuming after BB (2 countries committed)', output)
+        self.assertEqual(chunks, [['AA', 'BB'], ['CC', 'DD'], ['CC', 'DD'], ['EE']])
+        self.assertEqual(Country.objects.count(), 5)
+        self.assertEqual(Border.objects.count(), 4)
+        self.assertFalse((self.tmp / 'checkpoint.json').exists())
+
+    def test_failed_chunk_keeps_documents_current(self):
+        self.populate_from(COUNTRIES, '--sync')
+        generation = get_generation()
+        self.fail_on_chunk(2, 'sync_countries')
+        aland, borduria = COUNTRIES
+        output = self.populate_from([dict(aland, population=999), borduria], '--sync', '--chunk-size', '1')
+        self.assertIn('Error: connection lost', output)
+        # Aland was committed before the failure and must not hide behind its old document
+        self.assertEqual(json.loads(CountryDocument.objects.get(pk='AA').body)['population'], 999)
+        self.assertEqual(RegionalRollup.objects.get(dimension='region').population_total, 1999)
+        self.assertNotEqual(get_generation(), generation)
+
+    def test_resume_rejects_a_mismatched_checkpoint(self):
+        records = COUNTRIES + [CARPANIA]
+        self.fail_on_chunk(2)
+        self.populate_from(records, '--chunk-size', '2')
+
+        # The committed chunk ended with Borduria, not Aland
+        with self.assertRaisesMessage(CommandError, 'Checkpoint does not match the source data'):
+            self.populate_from(list(reversed(COUNTRIES)) + [CARPANIA], '--chunk-size', '2', '--resume')
+        with self.assertRaisesMessage(CommandError, 'Checkpoint was written for'):
+            self.populate('--bulk', '--resume', '--force')
+        (self.tmp / 'checkpoint.json').unlink()
+        with self.assertRaisesMessage(CommandError, 'No checkpoint found'):
+            self.populate_from(records, '--resume')
+
+    def test_second_run_skips_unmodified_upstream(self):
+        self.populate('--bulk')
+        self.assertEqual(Country.objects.count(), 2)
+        self.assertEqual(Border.objects.count(), 2)
+
+        output = self.populate('--bulk')
+        self.assertIn('not modified', output)
+
+    def test_fields_projection_is_requested(self):
+        self.populate('--bulk', '--fields', 'cca2,cca3,name')
+        self.assertTrue(self.server.seen_paths[-1].endswith('?fields=cca2%2Ccca3%2Cname'))
+        self.assertEqual(Country.objects.count(), 2)
+
+    def test_ingest_rebuilds_documents_once(self):
+        # Row-by-row ingest writes through the ORM, but leaves no per-commit rebuilds behind
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.populate()
+        self.assertEqual(callbacks, [])
+        self.assertEqual(CountryDocument.objects.count(), 2)
+        self.assertEqual(RegionalRollup.objects.get(dimension='region').countries, 2)
+
+    def test_snapshot_round_trip(self):
+        self.populate('--bulk')
+        before = list(Country.objects.values())
+        export_snapshot(self.tmp / 'snapshot.json.gz')
+        Border.objects.all().delete()
+        Country.objects.all().delete()
+
+        counts = import_snapshot(self.tmp / 'snapshot.json.gz')
+        self.assertEqual(counts['cntrydetails.country'], 2)
+        self.assertEqual(list(Country.objects.values()), before)
+        self.assertEqual(Border.objects.count(), 2)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CountryDetailsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        with TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'countries.json'
+            path.write_text(json.dumps(COUNTRIES + [CARPANIA]))
+            call_command('populate_database', '--bulk', from_file=str(path), stdout=StringIO())
+        cls.user = User.objects.create_user('reader', password='secret')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_details_query_budget(self):
+        CountryDocument.objects.all().delete()
+        self.client.force_login(self.user)
+        for name in ('Aland', 'Carpania'):
+            # session + user, document validators and body (both missing),
+            # the country with its single-row relations, 11 prefetches
+            with self.assertNumQueries(16):
+                response = self.client.get(reverse('country_details', args=[name]))
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(response.json()['borders']), ['AAA', 'BBB'])
+        self.assertEqual(response.json()['capital']['name'], 'Carpa')
+
+    def test_lookup_by_normalized_name_and_code(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('country_details', args=['ÅLAND']))
+        self.assertEqual(response.json()['common_name'], 'Aland')
+        self.assertNotIn('lookup_key', response.json())
+        response = self.client.get(reverse('country_details_cca3', args=['bbb']))
+        self.assertEqual(response.json()['common_name'], 'Borduria')
+
+        self.client.patch(reverse('country_update_cca2', args=['CC']), {'common_name': 'Côte Carpania'}, content_type='application/json')
+        response = self.client.get(reverse('same_regional_country', args=['cote-carpania']))
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(Country.objects.filter(lookup_key='aland').explain(), r'USING INDEX \S+ \(lookup_key=\?\)')
+
+        # A name only differing in case or accents would shadow another country's URLs
+        response = self.client.patch(reverse('country_update_cca2', args=['BB']), {'common_name': 'ÅLAND'}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('common_name', response.json())
+
+        # Model forms such as the admin's get the same check
+        borduria = Country.objects.get(pk='BB')
+        borduria.validate_unique()
+        borduria.common_name = 'aland'
+        with self.assertRaisesMessage(ValidationError, 'A country with this name already exists.'):
+            borduria.validate_unique()
+
+    def test_details_served_from_document(self):
+        self.client.force_login(self.user)
+        # session + user, document validators, document body
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('country_details', args=['carpania']))
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response.content, render_document(Country.objects.get(pk='CC')))
+
+    def test_document_rebuilt_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Capital.objects.filter(country='CC').update(name='Stale')
+            capital = Capital.objects.get(country='CC')
+            capital.name = 'New Carpa'
+            capital.save()
+        document = json.loads(CountryDocument.objects.get(pk='CC').body)
+        self.assertEqual(document['capital']['name'], 'New Carpa')
+
+    def test_migrate_fills_missing_documents(self):
+        # Countries stored before the document table was added have no documents
+        CountryDocument.objects.exclude(pk='AA').delete()
+        emit_post_migrate_signal(verbosity=0, interactive=False, db='default')
+        self.assertEqual(sorted(CountryDocument.objects.values_list('pk', flat=True)), ['AA', 'BB', 'CC'])
+        self.assertEqual(CountryDocument.objects.get(pk='BB').body.encode(), render_document(Country.objects.get(pk='BB')))
+
+    def test_cached_reads_follow_writes(self):
+        self.client.force_login(self.user)
+        url = reverse('country_details', args=['Aland'])
+        self.client.get(url)
+        # session + user, document validators
+        with self.assertNumQueries(3):
+            self.assertEqual(self.client.get(url).json()['population'], 1000)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                reverse('country_update', args=['Aland']), {'population': 5}, content_type='application/json'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(url).json()['population'], 5)
+
+    def test_conditional_get(self):
+        self.client.force_login(self.user)
+        for url in (reverse('country_list'), reverse('country_details', args=['Aland'])):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.has_header('Last-Modified'))
+            # session + user + modification state
+            with self.assertNumQueries(3):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.content, b'')
+
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse('country_update', args=['Aland']), {'population': 5}, content_type='application/json')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_list_pages_by_cursor(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('country_list'), {'page_size': 2}).json()
+        self.assertEqual([c['common_name'] for c in response['results']], ['Aland', 'Borduria'])
+        self.assertEqual(set(response['results'][0]), {'common_name', 'official_name'})
+        response = self.client.get(response['next']).json()
+        self.assertEqual([c['common_name'] for c in response['results']], ['Carpania'])
+        self.assertIsNone(response['next'])
+
+    def test_sparse_fieldsets(self):
+        self.client.force_login(self.user)
+        url = reverse('country_details', args=['Carpania'])
+        # session + user, document validators, one joined country query
+        with self.assertNumQueries(4):
+            response = self.client.get(url, {'fields': 'cca3,population', 'expand': 'flag'}).json()
+        self.assertEqual(set(response), {'cca3', 'population', 'flag'})
+        self.assertEqual(response['flag']['emoji'], '🏳')
+
+        response = self.client.get(reverse('country_list'), {'expand': 'borders'}).json()
+        self.assertEqual(set(response['results'][0]), {'common_name', 'official_name', 'borders'})
+        self.assertEqual(response['results'][2]['borders'], ['AAA', 'BBB'])
+
+    def test_batch_lookup(self):
+        self.client.force_login(self.user)
+        codes = ['aa', 'BBB', 'ZZ', '1x', 'CCC']
+        # session + user, one query for every code
+        with self.assertNumQueries(3):
+            response = self.client.post(reverse('country_batch'), {'codes': codes}, content_type='application/json')
+        body = response.json()
+        self.assertEqual(list(body['results']), ['aa', 'BBB', 'CCC'])
+        self.assertEqual(body['results']['BBB']['common_name'], 'Borduria')
+        self.assertEqual(body['not_found'], ['ZZ'])
+        self.assertEqual(body['invalid'], ['1x'])
+
+        CountryDocument.objects.filter(pk='AA').delete()
+        response = self.client.get(reverse('country_batch'), {'codes': 'AAA'})
+        self.assertEqual(response.json()['results']['AAA']['cca2'], 'AA')
+
+    def test_ndjson_export(self):
+        self.client.force_login(self.user)
+        CountryDocument.objects.filter(pk='BB').delete()
+        response = self.client.get(reverse('country_export'))
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['cca2'] for line in lines], ['AA', 'BB', 'CC'])
+        self.assertEqual(lines[1].encode(), render_document(Country.objects.get(pk='BB')))
+
+    def test_search_ranks_and_tolerates_typos(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('country-search'), {'q': 'Bordruia'}).json()
+        self.assertEqual(response['Results'][0], 'Borduria')
+        response = self.client.get(reverse('country-search'), {'q': 'ccc'}).json()
+        self.assertEqual(response['Matches'][0]['cca2'], 'CC')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse('country_update', args=['Aland']), {'common_name': 'Ruritania'}, content_type='application/json')
+        response = self.client.get(reverse('country-search'), {'q': 'ruritania'}).json()
+        self.assertEqual(response['Results'], ['Ruritania'])
+
+    @override_settings(COUNTRY_SEARCH_BACKEND='fts5')
+    def test_fts5_search(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('country-search'), {'q': 'bord'}).json()
+        self.assertEqual(response['Results'], ['Borduria'])
+        self.assertEqual(response['Matches'][0]['matched'], '<mark>Borduria</mark>')
+
+        # Triggers keep the index in step with writes
+        Country.objects.filter(pk='AA').update(common_name='Ruritania')
+        response = self.client.get(reverse('country-search'), {'q': 'ruri'}).json()
+        self.assertEqual(response['Results'], ['Ruritania'])
+        # Only the untouched official name still mentions the old name
+        response = self.client.get(reverse('country-search'), {'q': 'aland'}).json()
+        self.assertEqual(response['Matches'][0]['matched'], 'Republic of <mark>Aland</mark>')
+
+    def test_border_graph(self):
+        self.client.force_login(self.user)
+        # Borders recorded on one side only (Carpania's) still connect both countries
+        response = self.client.get(reverse('border_route', args=['aaa', 'Carpania'])).json()
+        self.assertEqual(response['crossings'], 1)
+        self.assertEqual([c['cca2'] for c in response['route']], ['AA', 'CC'])
+        response = self.client.get(reverse('border_reach', args=['BB', 1])).json()
+        self.assertEqual([(c['cca3'], c['crossings']) for c in response['countries']], [('AAA', 1), ('CCC', 1)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Border.objects.filter(country__in=['AA', 'BB']).delete()
+            Border.objects.filter(country='CC', neighbor='BB').delete()
+        response = self.client.get(reverse('border_route', args=['AA', 'BB'])).json()
+        self.assertIsNone(response['route'])
+        response = self.client.get(reverse('landmasses')).json()
+        self.assertEqual(response, {'landmasses': [{'size': 2, 'countries': ['AAA', 'CCC']}], 'isolated': ['BBB']})
+
+    def test_geo_queries(self):
+        self.client.force_login(self.user)
+        # Every test country sits at 50N 10E; Carpa is the only capital
+        response = self.client.get(reverse('geo_nearest'), {'lat': 50, 'lon': 11, 'k': 2}).json()
+        self.assertEqual([c['cca2'] for c in response['results']], ['AA', 'BB'])
+        self.assertAlmostEqual(response['results'][0]['distance_km'], 71.5, delta=0.1)
+        response = self.client.get(reverse('geo_radius'), {'lat': 50, 'lon': 11, 'km': 70, 'of': 'capitals'}).json()
+        self.assertEqual(response['results'], [])
+        response = self.client.get(reverse('geo_radius'), {'lat': 50, 'lon': 11, 'km': 72, 'of': 'capitals'})
+        self.assertEqual([c['name'] for c in response.json()['results']], ['Carpa'])
+        self.assertEqual(self.client.get(reverse('geo_radius'), {'lat': 50, 'lon': 11}).status_code, 400)
+
+    def test_geo_skips_capitals_without_coordinates(self):
+        self.client.force_login(self.user)
+        # Ingest stores a capital without capitalInfo at 0, 0
+        with self.captureOnCommitCallbacks(execute=True):
+            Capital.objects.create(country_id='AA', name='Nowhere', latitude=0.0, longitude=0.0)
+        response = self.client.get(reverse('geo_nearest'), {'lat': 0, 'lon': 0, 'k': 5, 'of': 'capitals'}).json()
+        self.assertEqual([c['name'] for c in response['results']], ['Carpa'])
+        response = self.client.get(reverse('geo_radius'), {'lat': 0, 'lon': 0, 'km': 20000, 'of': 'capitals'}).json()
+        self.assertEqual([c['name'] for c in response['results']], ['Carpa'])
+
+    def test_capital_distance_matrix(self):
+        self.client.force_login(self.user)
+        with TemporaryDirectory() as tmp, self.settings(CAPITAL_DISTANCES_DIR=tmp):
+            url = reverse('capital_distance', args=['CC', 'aaa'])
+            self.assertEqual(self.client.get(url).status_code, 503)
+            Capital.objects.create(country_id='AA', name='Alandia', latitude=51.0, longitude=10.0)
+            call_command('build_distance_matrix', stdout=StringIO())
+            self.assertAlmostEqual(self.client.get(url).json()['km'], 111.2, delta=0.1)
+            response = self.client.get(reverse('closest_capitals'), {'k': 5}).json()
+            self.assertEqual([(p['from']['capital'], p['to']['capital']) for p in response['pairs']], [('Alandia', 'Carpa')])
+
+    def test_autocomplete(self):
+        self.client.force_login(self.user)
+        url = reverse('country-autocomplete')
+        response = self.client.get(url, {'q': 'car'}).json()
+        self.assertEqual(response['results'], [
+            {'cca2': 'CC', 'cca3': 'CCC', 'name': 'Carpania', 'flag': '🏳', 'matched': 'Carpania'}
+        ])
+        # Later words of a name complete too, after whole-name matches of the same kind
+        response = self.client.get(url, {'q': 'bord'}).json()
+        self.assertEqual([c['matched'] for c in response['results']], ['Borduria'])
+        response = self.client.get(url, {'q': 'rep', 'limit': 2}).json()
+        self.assertEqual([c['name'] for c in response['results']], ['Aland', 'Borduria'])
+        # Exact codes come first; the index is warm, so only the session is read
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {'q': 'ccc'}).json()
+        self.assertEqual(response['results'][0]['matched'], 'CCC')
+
+        # A common name outranks official names starting with the prefix
+        index = PrefixIndex(
+            [('GB', 'GBR', 'United Kingdom', ''), ('ES', 'ESP', 'Spain', ''), ('TO', 'TON', 'Tonga', '')],
+            [
+                ('ES', 'Kingdom of Spain', 'official_name'),
+                ('TO', 'Kingdom of Tonga', 'official_name'),
+                ('GB', 'United Kingdom', 'common_name'),
+                ('GB', 'United Kingdom of Great Britain and Northern Ireland', 'official_name'),
+            ]
+        )
+        self.assertEqual([c['cca2'] for c in index.complete('kingdom')], ['GB', 'ES', 'TO'])
+
+    def test_regional_rollups(self):
+        self.client.force_login(self.user)
+        europe, = self.client.get(reverse('regional_rollups'), {'dimension': 'region'}).json()['region']
+        self.assertEqual(
+            (europe['name'], europe['countries'], europe['population_total'], europe['landlocked_count']),
+            ('Europe', 3, 3000, 0)
+        )
+
+        # Rollups are refreshed once the write commits
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                reverse('country_update', args=['Aland']),
+                {'population': 4000, 'area': 10, 'landlocked': True}, content_type='application/json'
+            )
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(reverse('regional_rollups')).json()
+        self.assertEqual(sorted(response), ['continent', 'region', 'subregion'])
+        self.assertEqual(
+            {key: response['subregion'][0][key] for key in ('population_total', 'population_median', 'landlocked_count')},
+            {'population_total': 6000, 'population_median': 1000, 'landlocked_count': 1}
+        )
+
+        response = self.client.get(reverse('country_statistics'), {'group_by': 'landlocked', 'continent': 'europe,asia'})
+        self.assertEqual(
+            [(group['landlocked'], group['countries'], group['density']) for group in response.json()['groups']],
+            [(False, 2, None), (True, 1, 400.0)]
+        )
+        response = self.client.get(reverse('country_statistics'), {'group_by': 'region,region'})
+        self.assertEqual([(group['region'], group['countries']) for group in response.json()['groups']], [('Europe', 3)])
+        self.assertEqual(self.client.get(reverse('country_statistics'), {'group_by': 'colour'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('regional_rollups'), {'dimension': 'planet'}).status_code, 400)
+
+    def test_fast_renderer_matches_drf(self):
+        self.client.force_login(self.user)
+        data = self.client.get(reverse('regional_rollups')).data
+        self.assertIsInstance(data['region'][0]['refreshed_at'], datetime)
+        data['region'][0]['checked'] = date(2026, 10, 17)
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+        data['region'][0]['density'] = float('nan')
+        for renderer in (FastJSONRenderer, JSONRenderer):
+            with self.assertRaises(ValueError):
+                renderer().render(data)
+        with mock.patch.object(JSONRenderer, 'strict', False):
+            self.assertIn(b'"density":NaN', FastJSONRenderer().render(data))
+
+        # orjson writes exponents without padding and rejects integers past 64 bits
+        for value in (1e-7, 1e16, -2.5e-5, 2 ** 64, -2 ** 63 - 1):
+            data['region'][0]['density'] = value
+            self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_migrate_fills_missing_rollups(self):
+        # Countries stored before the rollup table was added have no rollups
+        expected = sorted(RegionalRollup.objects.values_list('dimension', 'name', 'countries', 'population_total'))
+        RegionalRollup.objects.all().delete()
+        emit_post_migrate_signal(verbosity=0, interactive=False, db='default')
+        self.assertEqual(sorted(RegionalRollup.objects.values_list('dimension', 'name', 'countries', 'population_total')), expected)
@@ -0,0 +1,71 @@
+"""
+Process-pool workers for the transform stage of populate_database --bulk.
+
+Workers turn raw upstream records into plain row tuples; the command's single
+writer stage turns them back into model instances for bulk_create. Nothing here
+imports models at module level, so workers also start under the "spawn" method.
+"""
+import django
+from django.apps import apps
+
+_worker = {}
+
+
+def pack_initial_data(initial_data):
+    """Reduce the lookup maps to primary keys so they pickle cheaply"""
+    return {
+        'continent_map': {name: obj.pk for name, obj in initial_data['continent_map'].items()},
+        'region_map': {name: obj.pk for name, obj in initial_data['region_map'].items()},
+        'subregion_map': {name: (obj.pk, obj.region_id) for name, obj in initial_data['subregion_map'].items()},
+        'currency_map': list(initial_data['currency_map']),
+        'language_map': list(initial_data['language_map']),
+    }
+
+
+def unpack_initial_data(packed):
+    """Rebuild the lookup maps as unsaved instances carrying only their keys"""
+    Continent = apps.get_model('cntrydetails', 'Continent')
+    Region = apps.get_model('cntrydetails', 'Region')
+    Subregion = apps.get_model('cntrydetails', 'Subregion')
+    Currency = apps.get_model('cntrydetails', 'Currency')
+    Language = apps.get_model('cntrydetails', 'Language')
+    return {
+        'continent_map': {name: Continent(pk=pk) for name, pk in packed['continent_map'].items()},
+        'region_map': {name: Region(pk=pk) for name, pk in packed['region_map'].items()},
+        'subregion_map': {
+            name: Subregion(pk=pk, region_id=region_id)
+            for name, (pk, region_id) in packed['subregion_map'].items()
+        },
+        'currency_map': {code: Currency(code=code) for code in packed['currency_map']},
+        'language_map': {code: Language(iso_code=code) for code in packed['language_map']},
+    }
+
+
+def init_worker(packed_initial_data):
+    """Pool initializer: set up Django once per process and keep the lookups around"""
+    if not apps.ready:
+        django.setup()
+    from cntrydetails.management.commands.populate_database import Command
+    _worker['command'] = Command()
+    _worker['initial_data'] = unpack_initial_data(packed_initial_data)
+
+
+def transform_country(country_data):
+    """
+    Build the rows of one country as tuples of concrete field values, one list per
+    table in BULK_TABLES order. Returns (rows, None) or (None, error message).
+    """
+    from cntrydetails.management.commands.populate_database import BULK_TABLES
+    try:
+        rows = _worker['command'].build_country_rows(country_data, _worker['initial_data'])
+    except Exception as e:
+        return None, str(e)
+    return [
+        [row_values(obj) for obj in rows[model]]
+        for model in BULK_TABLES
+    ], None
+
+
+def row_values(obj):
+    """Concrete field values of an unsaved instance, in the order Model(*values) expects"""
+    return tuple(getattr(obj, field.attname) for field in obj._meta.concrete_fields)
@@ -1,6 +1,6 @@
 from django.urls import path
 from .views import CountryList,CountryDetails,CreateCountry, \
-UpdateCountryDetails,DeleteCountry,SameRegionalCountry,SameLanguageCountry,CountrySearch
+UpdateCountryDetails,DeleteCountry,SameRegionalCountry,SameLanguageCountry,CountrySearch,CountryAutocomplete,BorderRoute,BorderReach,Landmasses,GeoNearest,GeoRadius,CapitalDistance,CapitalDistances,ClosestCapitals,RegionalRollups,CountryStatistics,CountryBatch,CountryExport
 urlpatterns = [
     path('list/all/',CountryList.as_view(),name='country_list'),
     path('<str:common_name>/details/',CountryDetails.as_view(),name='country_details'),
@@ -8,7 +8,29 @@ urlpatterns = [
     path('<str:common_name>/update/',UpdateCountryDetails.as_view(),name='country_update'),
     path('delete/<str:common_name>/',DeleteCountry.as_view(),name='country_delete'),
     path('<str:common_name>/same_region_country/',SameRegionalCountry.as_view(),name='same_regional_country'),
+    #the same endpoints addressed by ISO code
+    path('cca2/<str:cca2>/details/',CountryDetails.as_view(),name='country_details_cca2'),
+    path('cca3/<str:cca3>/details/',CountryDetails.as_view(),name='country_details_cca3'),
+    path('cca2/<str:cca2>/update/',UpdateCountryDetails.as_view(),name='country_update_cca2'),
+    path('cca3/<str:cca3>/update/',UpdateCountryDetails.as_view(),name='country_update_cca3'),
+    path('delete/cca2/<str:cca2>/',DeleteCountry.as_view(),name='country_delete_cca2'),
+    path('delete/cca3/<str:cca3>/',DeleteCountry.as_view(),name='country_delete_cca3'),
+    path('cca2/<str:cca2>/same_region_country/',SameRegionalCountry.as_view(),name='same_regional_country_cca2'),
+    path('cca3/<str:cca3>/same_region_country/',SameRegionalCountry.as_view(),name='same_regional_country_cca3'),
     path('<str:language>/same_spoken_country/',SameLanguageCountry.as_view(),name='same_spoken_country'),
     path('search/',CountrySearch, name='country-search'),
+    path('autocomplete/',CountryAutocomplete, name='country-autocomplete'),
+    path('graph/route/<str:source>/<str:target>/',BorderRoute, name='border_route'),
+    path('graph/reach/<str:country>/<int:hops>/',BorderReach, name='border_reach'),
+    path('graph/landmasses/',Landmasses, name='landmasses'),
+    path('geo/nearest/',GeoNearest, name='geo_nearest'),
+    path('geo/radius/',GeoRadius, name='geo_radius'),
+    path('distances/closest-pairs/',ClosestCapitals, name='closest_capitals'),
+    path('distances/<str:source>/',CapitalDistances, name='capital_distances'),
+    path('distances/<str:source>/<str:target>/',CapitalDistance, name='capital_distance'),
+    path('stats/',CountryStatistics, name='country_statistics'),
+    path('stats/rollups/',RegionalRollups, name='regional_rollups'),
+    path('batch/',CountryBatch.as_view(),name='country_batch'),
+    path('export.ndjson',CountryExport.as_view(),name='country_export'),
 
 ]   
\ No newline at end of file
@@ -1,28 +1,105 @@
-from .models import Country,Language,CountryLanguage
+from .models import Country,Language,CountryLanguage,CountryDocument
 from .serializers import CountryListSerializer,CountryDetailsSerializer,CountrySerializer
-from rest_framework.views import APIView
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework import status
 from rest_framework import generics
 from django.shortcuts import get_object_or_404
+from django.http import Http404,HttpResponse,StreamingHttpResponse
+from .documents import iter_ndjson,lookup_documents
+from .renderers import FastJSONRenderer,NDJSONRenderer
 from .serializers import CreateUpdateCountrySerializer
+from .cache import cached_response
+from .pagination import CountryCursorPagination
+from .conditional import country_list_condition,country_details_condition
+from .lookups import country_lookup
+from django.utils.decorators import method_decorator
 from rest_framework.permissions import IsAuthenticated
-#list of all Country
-class CountryList(APIView):
+from rest_framework.exceptions import APIException,ValidationError
+
+#sparse fieldsets: ?fields=cca3,population picks the serialized fields and
+#?expand=flag,capital adds relations on top of them (or of default_fields)
+class SparseFieldsMixin:
+    default_fields = None  #None means every field of the serializer
+
+    def get_requested_fields(self):
+        params = self.request.query_params
+        if 'fields' in params:
+            fields = set(split_names(params['fields']))
+        elif 'expand' in params and self.default_fields is not None:
+            fields = set(self.default_fields)
+        else:
+            return None
+        return fields | set(split_names(params.get('expand', '')))
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.get_requested_fields()
+        if fields is not None:
+            kwargs['fields'] = fields
+        return super().get_serializer(*args, **kwargs)
+
+def split_names(value):
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+#countries are addressed by common name (any case or accents) or by cca2/cca3 code;
+#each resolves with one seek on an indexed column (see cntrydetails.lookups)
+class CountryLookupMixin:
+    def get_object(self):
+        return get_object_or_404(self.get_lookup_queryset(), **country_lookup(self.kwargs))
+
+    def get_lookup_queryset(self):
+        return Country.objects.all()
+
+#list of all Country, one keyset page at a time
+#only the serialized columns are loaded
+class CountryList(SparseFieldsMixin, generics.ListAPIView):
     permission_classes = [IsAuthenticated]
+    queryset = Country.objects.only('common_name', 'official_name')
+    serializer_class = CountryListSerializer
+    pagination_class = CountryCursorPagination
+    default_fields = CountryListSerializer.Meta.fields
+
+    #custom fieldsets are served by the details serializer, loading only what they need
+    def get_serializer_class(self):
+        if self.get_requested_fields() is None:
+            return CountryListSerializer
+        return CountryDetailsSerializer
+
+    def get_queryset(self):
+        fields = self.get_requested_fields()
+        if fields is None:
+            return super().get_queryset()
+        #the pagination cursor is read from common_name
+        return CountryDetailsSerializer.setup_eager_loading(Country.objects.all(), fields=fields | {'common_name'})
+
+    @method_decorator(country_list_condition)
+    @cached_response('country-list')
     def get(self,request,*args,**kwargs):
-        countrylist=Country.objects.all()
-        serializer=CountryListSerializer(instance=countrylist,many=True)
-        return Response(serializer.data)
+        return self.list(request,*args,**kwargs)
 
-class CountryDetails(generics.RetrieveAPIView):
+class CountryDetails(CountryLookupMixin, SparseFieldsMixin, generics.RetrieveAPIView):
     permission_classes = [IsAuthenticated]
     queryset = Country.objects.all()
     serializer_class = CountryDetailsSerializer
 
-    def get_object(self):
-        common_name = self.kwargs.get('common_name')
-        return get_object_or_404(Country, common_name__iexact=common_name)
+    #related rows are loaded up front so the response costs a fixed number of queries
+    def get_queryset(self):
+        return CountryDetailsSerializer.setup_eager_loading(super().get_queryset(), fields=self.get_requested_fields())
+
+    def get_lookup_queryset(self):
+        return self.get_queryset()
+
+    #plain JSON clients get the precomputed document without running the serializer
+    @method_decorator(country_details_condition)
+    @cached_response('country-details')
+    def retrieve(self, request, *args, **kwargs):
+        if request.accepted_renderer.format == 'json' and self.get_requested_fields() is None:
+            body = CountryDocument.objects.filter(
+                **country_lookup(self.kwargs, prefix='country__')
+            ).values_list('body', flat=True).first()
+            if body is not None:
+                return HttpResponse(body, content_type='application/json')
+        return super().retrieve(request, *args, **kwargs)
     
 #use this for browsable form in the browser
 class CreateCountry(generics.CreateAPIView):
@@ -32,38 +109,27 @@ class CreateCountry(generics.CreateAPIView):
 
 #update and existing country details
 #retrive first to populate the form data for seamless update
-class UpdateCountryDetails(generics.RetrieveUpdateAPIView):
+class UpdateCountryDetails(CountryLookupMixin, generics.RetrieveUpdateAPIView):
     queryset=Country.objects.all()
     serializer_class=CreateUpdateCountrySerializer
     permission_classes = [IsAuthenticated]
-    lookup_field = 'common_name'
-    #for accessing name with anytype letter
-    def get_object(self):
-        common_name = self.kwargs.get('common_name')
-        return get_object_or_404(Country, common_name__iexact=common_name)
     
 
 #delete an existing country
 #can be done using previous update details with some cahnges in url pattern
 #usees of genericAPIVIEW
 from rest_framework.generics import GenericAPIView
-class DeleteCountry(GenericAPIView):
+class DeleteCountry(CountryLookupMixin, GenericAPIView):
     queryset=Country.objects.all()
     serializer_class=CountrySerializer
     permission_classes = [IsAuthenticated]
-    lookup_field='common_name'
-    def get_object(self):
-        return get_object_or_404(Country,common_name__iexact=self.kwargs.get(self.lookup_field))
     def delete(self, request, *args, **kwargs):
         country = self.get_object()
         country.delete()
         return Response({"success": "Deleted Successfully"}, status=status.HTTP_200_OK)
 
-class SameRegionalCountry(generics.ListAPIView):
-    lookup_field='common_name'
+class SameRegionalCountry(CountryLookupMixin, generics.ListAPIView):
     permission_classes = [IsAuthenticated]
-    def get_object(self):
-        return get_object_or_404(Country,common_name__iexact=self.kwargs.get(self.lookup_field))
     
     def get_queryset(self):
         country=self.get_object()
@@ -73,6 +139,7 @@ class SameRegionalCountry(generics.ListAPIView):
         return queryset
     
     #overriding list to modify response
+    @cached_response('same-region')
     def list(self,request,*args,**kwargs):
         country=self.get_object()
         countries=self.get_queryset().values_list('common_name', flat=True)
@@ -96,6 +163,7 @@ class SameLanguageCountry(generics.ListAPIView):
         return queryset
     
     #overriding list to modify response
+    @cached_response('same-language')
     def list(self,request,*args,**kwargs):
         language=self.get_object()
         countries=self.get_queryset().values_list('country__common_name', flat=True)
@@ -106,18 +174,30 @@ class SameLanguageCountry(generics.ListAPIView):
 
 
 #Partial Country Search Result
+#ranked and typo-tolerant over every name, translation, spelling and code of a country
 from rest_framework.decorators import api_view,permission_classes
+from .search import DEFAULT_LIMIT,search_countries
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cached_response('search')
 def CountrySearch(request):
     if request.method=="GET":
         search_query=request.query_params.get('q','')
         if search_query:
-            countries=Country.objects.filter(common_name__icontains=search_query).values_list('common_name',flat=True)
-            if countries:
+            try:
+                limit=min(max(int(request.query_params.get('limit',DEFAULT_LIMIT)),1),100)
+            except ValueError:
+                limit=DEFAULT_LIMIT
+            matches=search_countries(search_query,limit)
+            if matches:
+                names=dict(Country.objects.filter(pk__in=[pk for pk,_,_ in matches]).values_list('pk','common_name'))
                 return Response({
                     "Search_query": search_query,
-                    "Results": list(countries)
+                    "Results": [names[pk] for pk,_,_ in matches if pk in names],
+                    "Matches": [
+                        {"cca2": pk, "common_name": names[pk], "score": score, "matched": term}
+                        for pk,score,term in matches if pk in names
+                    ]
                 }, status=status.HTTP_200_OK)
         # No matches found
             return Response({
@@ -129,3 +209,238 @@ def CountrySearch(request):
             "message": "Please provide a search query."
         }, status=status.HTTP_400_BAD_REQUEST)
 
+
+#typeahead for the search box: ?q=ger&limit=8, called on every keystroke; the
+#prefix index answers from memory, so responses skip the file-based response cache
+from .autocomplete import DEFAULT_LIMIT as AUTOCOMPLETE_LIMIT,MAX_LIMIT as AUTOCOMPLETE_MAX,autocomplete
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def CountryAutocomplete(request):
+    try:
+        limit=min(max(int(request.query_params.get('limit',AUTOCOMPLETE_LIMIT)),1),AUTOCOMPLETE_MAX)
+    except ValueError:
+        limit=AUTOCOMPLETE_LIMIT
+    prefix=request.query_params.get('q','')
+    return Response({
+        "query": prefix,
+        "results": autocomplete(prefix,limit),
+    }, status=status.HTTP_200_OK)
+
+
+#land border graph: routes, k-hop neighborhoods and landmasses, answered from the
+#in-memory graph (see cntrydetails.graph); countries by cca2, cca3 or common name
+from .graph import get_graph
+def graph_node(graph,key):
+    node=graph.node(key)
+    if node is None:
+        raise Http404(f"No country matches {key!r}.")
+    return node
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def BorderRoute(request,source,target):
+    graph=get_graph()
+    source,target=graph_node(graph,source),graph_node(graph,target)
+    route=graph.route(source,target)
+    return Response({
+        "from": graph.countries[source],
+        "to": graph.countries[target],
+        "crossings": len(route)-1 if route is not None else None,
+        "route": [graph.countries[node] for node in route] if route is not None else None,
+    }, status=status.HTTP_200_OK)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def BorderReach(request,country,hops):
+    graph=get_graph()
+    node=graph_node(graph,country)
+    distances=graph.within(node,hops)
+    return Response({
+        "country": graph.countries[node],
+        "hops": hops,
+        "countries": [
+            dict(graph.countries[node],crossings=crossings)
+            for node,crossings in sorted(distances.items(),key=lambda item: (item[1],item[0])) if crossings
+        ],
+    }, status=status.HTTP_200_OK)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def Landmasses(request):
+    graph=get_graph()
+    return Response({
+        "landmasses": [
+            {"size": len(nodes), "countries": [graph.countries[node]['cca3'] for node in nodes]}
+            for nodes in graph.landmasses if len(nodes)>1
+        ],
+        #countries without land borders
+        "isolated": [graph.countries[nodes[0]]['cca3'] for nodes in graph.landmasses if len(nodes)==1],
+    }, status=status.HTTP_200_OK)
+
+
+#nearest countries or capitals to a point, and everything within a radius, from the
+#in-memory spatial index (see cntrydetails.geo); ?lat=&lon=&of=capitals|countries
+from .geo import get_indexes
+def geo_query(request):
+    params=request.query_params
+    try:
+        lat,lon=float(params['lat']),float(params['lon'])
+    except (KeyError,ValueError):
+        raise ValidationError({"message": "Provide the point as numeric lat and lon."})
+    if not (-90<=lat<=90 and -180<=lon<=180):
+        raise ValidationError({"message": "lat must be within -90..90 and lon within -180..180."})
+    of=params.get('of','countries')
+    if of not in ('countries','capitals'):
+        raise ValidationError({"message": "of must be countries or capitals."})
+    return get_indexes()[of],lat,lon,of
+
+def geo_results(matches):
+    return [dict(item,distance_km=round(distance,1)) for item,distance in matches]
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def GeoNearest(request):
+    index,lat,lon,of=geo_query(request)
+    try:
+        k=min(max(int(request.query_params.get('k',5)),1),100)
+    except ValueError:
+        k=5
+    return Response({"lat": lat, "lon": lon, "of": of, "results": geo_results(index.nearest(lat,lon,k))}, status=status.HTTP_200_OK)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def GeoRadius(request):
+    index,lat,lon,of=geo_query(request)
+    try:
+        km=float(request.query_params['km'])
+    except (KeyError,ValueError):
+        raise ValidationError({"message": "Provide the radius in kilometres as km."})
+    if not km>=0:
+        raise ValidationError({"message": "km must be a non-negative number."})
+    return Response({"lat": lat, "lon": lon, "of": of, "km": km, "results": geo_results(index.within(lat,lon,km))}, status=status.HTTP_200_OK)
+
+
+#capital-to-capital distances from the memory-mapped matrix written by the
+#build_distance_matrix command (see cntrydetails.distances); capitals by cca2 or cca3
+from .distances import get_matrix
+class DistanceMatrixMissing(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "The distance matrix has not been built; run build_distance_matrix."
+
+def distance_matrix():
+    try:
+        return get_matrix()
+    except FileNotFoundError:
+        raise DistanceMatrixMissing()
+
+def matrix_row(matrix,code):
+    row=matrix.row(code)
+    if row is None:
+        raise Http404(f"No capital distances for {code!r}.")
+    return row
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def CapitalDistance(request,source,target):
+    matrix=distance_matrix()
+    source,target=matrix_row(matrix,source),matrix_row(matrix,target)
+    return Response({
+        "from": matrix.countries[source],
+        "to": matrix.countries[target],
+        "km": round(matrix.distance(source,target),1),
+    }, status=status.HTTP_200_OK)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def CapitalDistances(request,source):
+    matrix=distance_matrix()
+    source=matrix_row(matrix,source)
+    try:
+        limit=max(int(request.query_params.get('limit',len(matrix.countries))),1)
+    except ValueError:
+        limit=len(matrix.countries)
+    return Response({
+        "from": matrix.countries[source],
+        "created": matrix.created,
+        "distances": [dict(matrix.countries[row],km=round(km,1)) for row,km in matrix.distances(source)[:limit]],
+    }, status=status.HTTP_200_OK)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def ClosestCapitals(request):
+    matrix=distance_matrix()
+    try:
+        k=min(max(int(request.query_params.get('k',10)),1),1000)
+    except ValueError:
+        k=10
+    return Response({
+        "created": matrix.created,
+        "pairs": [
+            {"from": matrix.countries[source], "to": matrix.countries[target], "km": round(km,1)}
+            for source,target,km in matrix.closest_pairs(k)
+        ],
+    }, status=status.HTTP_200_OK)
+
+
+#population, area, density, landlocked and UN member counts per region, subregion
+#and continent, precomputed after every ingest and write (see cntrydetails.rollups)
+from .models import RegionalRollup
+from .rollups import DIMENSIONS,aggregate,rollup_rows
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def RegionalRollups(request):
+    dimension=request.query_params.get('dimension')
+    if dimension is not None and dimension not in RegionalRollup.Dimension.values:
+        raise ValidationError({"message": f"dimension must be one of {', '.join(RegionalRollup.Dimension.values)}."})
+    return Response(rollup_rows(dimension), status=status.HTTP_200_OK)
+
+#the same totals for any grouping, computed in one GROUP BY query:
+#?group_by=region,landlocked&continent=Europe,Asia&un_member=true
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@cached_response('stats')
+def CountryStatistics(request):
+    params=request.query_params
+    group_by=split_names(params.get('group_by',''))
+    filters={dimension: split_names(params[dimension]) for dimension in DIMENSIONS if dimension in params}
+    try:
+        groups=aggregate(group_by,filters)
+    except ValueError as e:
+        raise ValidationError({"message": f"{e}. Dimensions: {', '.join(DIMENSIONS)}."})
+    return Response({"group_by": group_by, "filters": filters, "groups": groups}, status=status.HTTP_200_OK)
+
+
+#documents of many countries at once, by cca2, cca3 or ccn3 codes
+#GET ?codes=DE,FRA,250 or POST {"codes": [...]}; a fixed number of queries for any number of codes
+class CountryBatch(APIView):
+    permission_classes = [IsAuthenticated]
+    max_codes = 500
+
+    @cached_response('batch')
+    def get(self,request,*args,**kwargs):
+        return self.lookup(split_names(request.query_params.get('codes','')))
+
+    def post(self,request,*args,**kwargs):
+        codes=request.data.get('codes') if isinstance(request.data,dict) else None
+        if not isinstance(codes,list) or not all(isinstance(code,(str,int)) for code in codes):
+            return Response({"message": "Provide a list of country codes as \"codes\"."}, status=status.HTTP_400_BAD_REQUEST)
+        return self.lookup([str(code) for code in codes])
+
+    def lookup(self,codes):
+        if not codes:
+            return Response({"message": "Please provide country codes."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(codes)>self.max_codes:
+            return Response({"message": f"At most {self.max_codes} codes per request."}, status=status.HTTP_400_BAD_REQUEST)
+        #documents are already JSON, so the response is assembled without decoding them
+        return HttpResponse(lookup_documents(codes), content_type='application/json')
+
+
+#every country document as newline-delimited JSON, streamed a chunk at a time
+class CountryExport(APIView):
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [NDJSONRenderer, FastJSONRenderer]
+
+    def get(self,request,*args,**kwargs):
+        response=StreamingHttpResponse(iter_ndjson(), content_type=NDJSONRenderer.media_type)
+        response['Content-Disposition']='attachment; filename="countries.ndjson"'
+        return response
@@ -1,5 +1,6 @@
 from django.shortcuts import render,get_object_or_404, redirect
 from cntrydetails.models import Country,CountryLanguage
+from cntrydetails.search import search_countries
 from django.contrib.auth.decorators import login_required
 from .forms import RegisterForm, LoginForm
 from django.contrib.auth import login, logout
@@ -48,9 +49,12 @@ def Homepage(request):
 def SearchResult(request):
     query=request.GET.get('q','')
     if query:
-        countries=Country.objects.filter(common_name__icontains=query)
+        #ranked matches from the in-memory search index, best first
+        ranked=[pk for pk,_,_ in search_countries(query,limit=50)]
+        found=Country.objects.select_related('capital','flag').prefetch_related('timezones').in_bulk(ranked)
+        countries=[found[pk] for pk in ranked if pk in found]
         return render(request,'search.html',context={"countries":countries,'query':query})
-    return render(request,'search.html',context={"countries":countries,'query':''})
+    return render(request,'search.html',context={"countries":[],'query':''})
 
 @login_required
 def CountryDetails(request, pk):
@@ -56,7 +56,8 @@ MIDDLEWARE = [
 #changes are made here
 REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        #orjson-backed when installed
+        'cntrydetails.renderers.FastJSONRenderer',
         'rest_framework.renderers.BrowsableAPIRenderer',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
@@ -99,6 +100,23 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# File-based so every web worker and the management commands share the dataset
+# generation that versions cached API responses (see cntrydetails/cache.py)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / '.cache' / 'responses',
+        'TIMEOUT': 60 * 60 * 24,
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -145,6 +163,18 @@ MEDIA_DIR=BASE_DIR/'media'
 MEDIA_URL='/media/'
 LOGIN_URL = '/login/'
 
+#upstream data source for the populate_database command
+COUNTRIES_API_URL = 'https://restcountries.com/v3.1/all'
+COUNTRIES_CACHE_DIR = BASE_DIR / '.cache' / 'restcountries'
+
+#country search: 'memory' (per-process trigram index, typo tolerant) or
+#'fts5' (SQLite full-text table shared by all workers, see migration 0006)
+COUNTRY_SEARCH_BACKEND = 'memory'
+
+#capital-to-capital distance matrix written by the build_distance_matrix command and
+#memory-mapped by every worker (see cntrydetails.distances)
+CAPITAL_DISTANCES_DIR = BASE_DIR / '.cache' / 'distances'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 